@@ -0,0 +1,95 @@
+"""
+Batched bulk inserts for Supabase (PostgREST) tables
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+from postgrest.types import ReturnMethod
+
+from _lib.utils import ingest_stats
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("UPLOAD_BATCH_SIZE", "1000"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("UPLOAD_MAX_CONCURRENCY", "4"))
+
+
+def iter_batches(rows: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Split rows into lists of at most batch_size items.
+
+    Args:
+        rows: Iterable of row dicts (may be a generator)
+        batch_size: Maximum rows per batch
+
+    Returns:
+        Iterator of row lists
+    """
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_batched(
+    supabase,
+    table: str,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = None,
+    max_concurrency: int = None,
+) -> Dict[str, Any]:
+    """
+    Insert rows into a table in chunks, running a bounded number of
+    chunk inserts concurrently.
+
+    Only max_concurrency batches are held in memory at a time, so rows can be
+    a generator over a large file.
+
+    Args:
+        supabase: Supabase client (or any client exposing table().insert().execute())
+        table: Target table name
+        rows: Iterable of row dicts
+        batch_size: Rows per insert request (default: UPLOAD_BATCH_SIZE or 1000)
+        max_concurrency: Concurrent insert requests (default: UPLOAD_MAX_CONCURRENCY or 4)
+
+    Returns:
+        Stats dict with rows, batches, seconds and rows_per_sec
+
+    Raises:
+        Exception: The first failed batch insert; pending batches are cancelled
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+
+    def insert(batch):
+        supabase.table(table).insert(batch, returning=ReturnMethod.minimal).execute()
+        return len(batch)
+
+    started = time.perf_counter()
+    total_rows = 0
+    total_batches = 0
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        pending = set()
+        try:
+            for batch in iter_batches(rows, batch_size):
+                if len(pending) >= max_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        total_rows += future.result()
+                        total_batches += 1
+                pending.add(executor.submit(insert, batch))
+
+            for future in pending:
+                total_rows += future.result()
+                total_batches += 1
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+
+    return ingest_stats(total_rows, time.perf_counter() - started, batches=total_batches)
+
@@ -0,0 +1,183 @@
+"""
+Snapshot table reads for Supabase (PostgREST) tables
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from _lib.tables import TABLE_SPECS
+
+DEFAULT_FETCH_TIMEOUT = float(os.environ.get("SNAPSHOT_FETCH_TIMEOUT", "30"))
+DEFAULT_FETCH_CONCURRENCY = int(os.environ.get("SNAPSHOT_FETCH_CONCURRENCY", "6"))
+
+# Must not exceed the PostgREST max-rows setting (1000 on Supabase by default),
+# otherwise a capped page is mistaken for the last one
+DEFAULT_PAGE_SIZE = int(os.environ.get("SNAPSHOT_PAGE_SIZE", "1000"))
+MAX_PAGE_LIMIT = int(os.environ.get("SNAPSHOT_MAX_PAGE_LIMIT", "10000"))
+
+
+def iter_table_pages(
+    supabase,
+    table: str,
+    snapshot_id: int,
+    columns: Iterable[str] = None,
+    cursor: Optional[int] = None,
+    page_size: int = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read a snapshot table page by page with keyset pagination on id.
+
+    Each request asks for rows with id greater than the last one seen, so
+    no page is ever truncated by the server row limit and deep pages cost
+    the same as the first.
+
+    Args:
+        supabase: Supabase client
+        table: Table name
+        snapshot_id: Snapshot ID
+        columns: Columns to select (default: all); id is always included
+        cursor: Only return rows with id greater than this
+        page_size: Rows per request (default: SNAPSHOT_PAGE_SIZE or 1000)
+
+    Returns:
+        Iterator of row lists, in id order
+    """
+    page_size = page_size or DEFAULT_PAGE_SIZE
+    select = "*" if columns is None else ",".join(["id", *(c for c in columns if c != "id")])
+
+    while True:
+        query = supabase.table(table).select(select).eq("snapshot_id", snapshot_id)
+        if cursor is not None:
+            query = query.gt("id", cursor)
+        rows = query.order("id").limit(page_size).execute().data or []
+
+        if rows:
+            yield rows
+            cursor = rows[-1]["id"]
+        if len(rows) < page_size:
+            return
+
+
+def fetch_table_page(
+    supabase,
+    table: str,
+    snapshot_id: int,
+    columns: Iterable[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = None,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Fetch one client-facing page of a snapshot table.
+
+    Args:
+        supabase: Supabase client
+        table: Table name
+        snapshot_id: Snapshot ID
+        columns: Columns to select (default: all); id is always included
+        cursor: Only return rows with id greater than this
+        limit: Maximum rows to return (default: SNAPSHOT_PAGE_SIZE or 1000)
+
+    Returns:
+        Tuple of (rows, next cursor or None when this is the last page)
+    """
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_LIMIT)
+
+    rows = []
+    for page in iter_table_pages(
+        supabase, table, snapshot_id, columns, cursor, page_size=min(limit, DEFAULT_PAGE_SIZE)
+    ):
+        rows.extend(page[:limit - len(rows)])
+        if len(rows) >= limit:
+            break
+
+    next_cursor = rows[-1]["id"] if len(rows) == limit else None
+    return rows, next_cursor
+
+
+def fetch_snapshot_tables(
+    supabase,
+    snapshot_id: int,
+    timeout: float = None,
+    max_workers: int = None,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str]]:
+    """
+    Fetch every snapshot table concurrently.
+
+    All reads share one deadline, so the call takes roughly as long as the
+    slowest table rather than the sum of all six. A table that fails or
+    misses the deadline comes back empty and is reported in errors instead
+    of failing the whole snapshot.
+
+    Args:
+        supabase: Supabase client
+        snapshot_id: Snapshot ID
+        timeout: Combined deadline in seconds (default: SNAPSHOT_FETCH_TIMEOUT or 30)
+        max_workers: Concurrent table reads (default: SNAPSHOT_FETCH_CONCURRENCY or 6)
+
+    Returns:
+        Tuple of (rows by table name, error message by table name)
+    """
+    timeout = timeout or DEFAULT_FETCH_TIMEOUT
+    max_workers = max_workers or DEFAULT_FETCH_CONCURRENCY
+
+    def fetch(table):
+        rows = []
+        for page in iter_table_pages(supabase, table, snapshot_id):
+            rows.extend(page)
+        return rows
+
+    tables = {}
+    errors = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(fetch, table): table for table in TABLE_SPECS}
+        done, not_done = wait(futures, timeout=timeout)
+
+        for future, table in futures.items():
+            if future in not_done:
+                tables[table] = []
+                errors[table] = f"Timed out after {timeout:g}s"
+            elif future.exception() is not None:
+                error = future.exception()
+                tables[table] = []
+                # postgrest APIError carries the server message separately
+                errors[table] = getattr(error, "message", None) or str(error)
+            else:
+                tables[table] = future.result()
+    finally:
+        # Don't block the response on reads that missed the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return tables, errors
+
+
+def stream_snapshot_tables(
+    supabase,
+    snapshot_id: int,
+    errors: Dict[str, str],
+) -> Dict[str, Iterator[Dict[str, Any]]]:
+    """
+    Lazily stream every snapshot table for a streaming response.
+
+    Pages are only requested as the encoder consumes rows, so memory stays
+    at one page per table regardless of snapshot size. A table that fails
+    ends early and its message is recorded in errors; encode errors after
+    the tables so it is complete by the time it is written.
+
+    Args:
+        supabase: Supabase client
+        snapshot_id: Snapshot ID
+        errors: Dict that receives error messages by table name
+
+    Returns:
+        Row iterator by table name
+    """
+    def rows(table):
+        try:
+            for page in iter_table_pages(supabase, table, snapshot_id):
+                yield from page
+        except Exception as error:
+            errors[table] = getattr(error, "message", None) or str(error)
+
+    return {table: rows(table) for table in TABLE_SPECS}
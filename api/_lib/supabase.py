@@ -1,10 +1,75 @@
 """
 Supabase client configuration for serverless functions
+
+One client (and one keep-alive HTTP connection pool) is created lazily per
+process and reused by every handler for as long as the instance stays warm.
 """
 import os
-from supabase import create_client, Client
+import threading
+import time
+from typing import Any, Dict
+
+import httpx
+from supabase import create_client, Client, ClientOptions
+
+POOL_MAX_CONNECTIONS = int(os.environ.get("SUPABASE_POOL_MAX_CONNECTIONS", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.environ.get("SUPABASE_POOL_KEEPALIVE_SECONDS", "60"))
+REQUEST_TIMEOUT = float(os.environ.get("SUPABASE_REQUEST_TIMEOUT", "120"))
 
 _client = None
+_client_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "client_created_at": None,
+    "requests": 0,
+    "new_connections": 0,
+    "reused_connections": 0,
+    "failed_connections": 0,
+    "tls_handshakes": 0,
+}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _on_request(request: httpx.Request) -> None:
+    _count("requests")
+    connected = False
+
+    def trace(event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore only emits connect/start_tls events when it has to open a
+        # connection; a request sent without one was served from the pool.
+        # Requests that never get to send (failed connect, pool timeout)
+        # count as neither
+        nonlocal connected
+        if event_name == "connection.connect_tcp.complete":
+            connected = True
+            _count("new_connections")
+        elif event_name == "connection.connect_tcp.failed":
+            _count("failed_connections")
+        elif event_name == "connection.start_tls.complete":
+            _count("tls_handshakes")
+        elif event_name.endswith(".send_request_headers.started") and not connected:
+            _count("reused_connections")
+
+    request.extensions["trace"] = trace
+
+
+def _create_http_client() -> httpx.Client:
+    return httpx.Client(
+        timeout=httpx.Timeout(REQUEST_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_CONNECTIONS,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+        event_hooks={"request": [_on_request]},
+    )
+
 
 def get_supabase_client() -> Client:
     """
@@ -14,12 +79,32 @@ def get_supabase_client() -> Client:
     global _client
 
     if _client is None:
-        url = os.environ.get("SUPABASE_URL")
-        key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        with _client_lock:
+            if _client is None:
+                url = os.environ.get("SUPABASE_URL")
+                key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 
-        if not url or not key:
-            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+                if not url or not key:
+                    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
 
-        _client = create_client(url, key)
+                _client = create_client(url, key, options=ClientOptions(httpx_client=_create_http_client()))
+                _stats["client_created_at"] = time.time()
 
     return _client
+
+
+def get_client_stats() -> Dict[str, Any]:
+    """
+    Get connection reuse counters for this process.
+
+    Returns:
+        Dict with requests, new_connections, reused_connections,
+        failed_connections, tls_handshakes and the client's age in seconds
+        (None before first use)
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    created_at = stats.pop("client_created_at")
+    stats["client_age_seconds"] = round(time.time() - created_at, 1) if created_at else None
+    return stats
@@ -0,0 +1,182 @@
+"""
+Snapshot table specs shared by every upload and read path.
+
+Each table is declared once (source CSV headers, target column, dtype) and
+compiled at import time into a vectorized chunk ingest function, so main.py,
+api/index.py and api/upload.py all map and clean uploads the same way.
+"""
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from _lib.utils import clean_numeric_columns, detect_encoding, iter_csv_chunks, read_csv_header
+
+
+class ColumnSpec(NamedTuple):
+    target: str
+    sources: Tuple[str, ...]
+    dtype: str
+    display: str
+
+
+class TableSpec(NamedTuple):
+    name: str
+    form_field: str
+    columns: Tuple[ColumnSpec, ...]
+    text_columns: Tuple[str, ...]
+    numeric_columns: Tuple[str, ...]
+    display_names: Dict[str, str]
+    read_csv_options: Callable[[List[str]], Dict[str, object]]
+    ingest: Callable[[pd.DataFrame], pd.DataFrame]
+
+
+def column(target: str, *sources: str, dtype: str = "text", display: Optional[str] = None) -> ColumnSpec:
+    """
+    Declare a table column.
+
+    Args:
+        target: Database column name
+        *sources: Accepted CSV headers, in priority order (the target name is always accepted last)
+        dtype: "text" or "numeric"
+        display: Header used when returning rows to the frontend (default: first source)
+
+    Returns:
+        ColumnSpec
+    """
+    return ColumnSpec(target, sources + (target,), dtype, display or sources[0])
+
+
+def _compile(name: str, form_field: str, columns: Tuple[ColumnSpec, ...]) -> TableSpec:
+    """Compile a table declaration into its chunk ingest function."""
+    text_columns = tuple(c.target for c in columns if c.dtype == "text")
+    numeric_columns = tuple(c.target for c in columns if c.dtype == "numeric")
+    known_headers = frozenset(source for c in columns for source in c.sources)
+    text_headers = frozenset(source for c in columns if c.dtype == "text" for source in c.sources)
+
+    def read_csv_options(header: List[str]) -> Dict[str, object]:
+        # Text columns stay strings (codes keep leading zeros and never flip
+        # between int/float across chunks); numeric columns are parsed by the
+        # C parser with thousands separators, so most need no cleaning at all
+        return {
+            "usecols": [h for h in header if h.strip() in known_headers],
+            "dtype": {h: str for h in header if h.strip() in text_headers},
+            "thousands": ",",
+        }
+
+    def ingest(chunk: pd.DataFrame) -> pd.DataFrame:
+        # Project and rename in one step; the first present source header wins
+        present = set(chunk.columns)
+        data = {}
+        for spec in columns:
+            source = next((s for s in spec.sources if s in present), None)
+            if source is not None:
+                data[spec.target] = chunk[source]
+        df = pd.DataFrame(data, index=chunk.index)
+
+        return clean_numeric_columns(df, numeric_columns)
+
+    return TableSpec(
+        name=name,
+        form_field=form_field,
+        columns=columns,
+        text_columns=text_columns,
+        numeric_columns=numeric_columns,
+        display_names={c.target: c.display for c in columns},
+        read_csv_options=read_csv_options,
+        ingest=ingest,
+    )
+
+
+def _monthly_columns() -> Tuple[ColumnSpec, ...]:
+    return (column("year_total", "2025년", dtype="numeric"),) + tuple(
+        column(f"month_{i:02d}", f"{i}월", dtype="numeric") for i in range(1, 13)
+    )
+
+
+TABLE_SPECS: Dict[str, TableSpec] = {
+    spec.name: spec
+    for spec in (
+        _compile("order_data", "order_file", (
+            column("creation_date", "생성일"),
+            column("customer_code", "고객약호"),
+            column("sales_team", "영업팀명"),
+            column("material_code", "자재"),
+            column("category_name", "중분류명"),
+            column("backlog_qty", "미납잔량", dtype="numeric"),
+            column("unit_price", "단가", dtype="numeric"),
+            column("delivery_date", "변경납기일"),
+        )),
+        _compile("price_table", "price_file", (
+            column("category_code", "관리유형코드(중)", "중분류", display="중분류"),
+            column("average_price", "평균단가", dtype="numeric"),
+        )),
+        _compile("plan_customer", "plan_customer_file", (
+            column("customer", "고객사"),
+        ) + _monthly_columns()),
+        _compile("expect_customer", "expect_customer_file", (
+            column("customer", "고객사"),
+        ) + _monthly_columns()),
+        _compile("plan_category", "plan_category_file", (
+            column("category", "중분류", "중분류명"),
+        ) + _monthly_columns()),
+        _compile("actual_sales", "actual_sales_file", (
+            column("customer_code", "고객약호"),
+            column("category_name", "중분류명"),
+            column("sales_amount", "매출", dtype="numeric"),
+            column("invoice_date", "대금청구일"),
+        )),
+    )
+}
+
+
+def iter_table_chunks(table: str, fileobj: BinaryIO, chunksize: int = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream an uploaded CSV as cleaned chunks ready to insert into a table.
+
+    Args:
+        table: Table name (key of TABLE_SPECS)
+        fileobj: Seekable binary file object
+        chunksize: Rows per chunk (default: CSV_CHUNK_ROWS)
+
+    Returns:
+        Iterator of DataFrames with target column names and cleaned numerics
+    """
+    spec = TABLE_SPECS[table]
+    encoding = detect_encoding(fileobj)
+    options = spec.read_csv_options(read_csv_header(fileobj, encoding))
+    for chunk in iter_csv_chunks(fileobj, chunksize, encoding=encoding, **options):
+        yield spec.ingest(chunk)
+
+
+def resolve_columns(table: str, columns: Optional[str]) -> Tuple[str, ...]:
+    """
+    Resolve a comma-separated column projection for a table.
+
+    Args:
+        table: Table name (key of TABLE_SPECS)
+        columns: Database column names or display headers, comma-separated
+            (empty selects every column)
+
+    Returns:
+        Database column names in the requested order
+
+    Raises:
+        ValueError: If a column is not part of the table
+    """
+    spec = TABLE_SPECS[table]
+    if not columns:
+        return tuple(c.target for c in spec.columns)
+
+    lookup = {c.target: c.target for c in spec.columns}
+    lookup.update({c.display: c.target for c in spec.columns})
+
+    resolved = []
+    for name in columns.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in lookup:
+            raise ValueError(f"Unknown column for {table}: {name}")
+        if lookup[name] not in resolved:
+            resolved.append(lookup[name])
+    return tuple(resolved)
@@ -1,11 +1,22 @@
 """
 Utility functions for serverless API
 """
+import codecs
 import json
 import io
+import os
+import urllib.parse
 import pandas as pd
 from http.server import BaseHTTPRequestHandler
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, List, Optional
+
+# Bytes inspected to pick the file encoding, and rows parsed per chunk
+ENCODING_PREFIX_BYTES = 64 * 1024
+DEFAULT_CHUNK_ROWS = int(os.environ.get("CSV_CHUNK_ROWS", "50000"))
+
+# Encoded bytes buffered before each write of a streamed response
+STREAM_CHUNK_BYTES = 64 * 1024
+_COMPACT = (",", ":")
 
 def success_response(data: Any) -> Dict[str, Any]:
     """
@@ -58,6 +69,104 @@ def send_json_response(handler: BaseHTTPRequestHandler, status: int, data: Dict[
     handler.wfile.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
 
 
+def _iter_json_pieces(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            yield ("," if i else "") + json.dumps(str(key), ensure_ascii=False) + ":"
+            yield from _iter_json_pieces(item)
+        yield "}"
+    elif isinstance(value, Iterator):
+        yield "["
+        for i, item in enumerate(value):
+            yield ("," if i else "") + json.dumps(item, ensure_ascii=False, separators=_COMPACT)
+        yield "]"
+    else:
+        yield json.dumps(value, ensure_ascii=False, separators=_COMPACT)
+
+
+def _buffer_chunks(pieces: Iterable[str], chunk_bytes: int) -> Iterator[bytes]:
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_json_chunks(data: Any, chunk_bytes: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode JSON incrementally.
+
+    Iterators anywhere in data (e.g. generators over DB rows) are written as
+    JSON arrays one item at a time, so rows are never all held in memory.
+    Other values are encoded when the encoder reaches them; a dict placed
+    after the iterators (such as an errors object) can still be filled in
+    while they are consumed.
+
+    Args:
+        data: JSON-serializable value, possibly containing iterators
+        chunk_bytes: Approximate size of each yielded chunk
+
+    Returns:
+        Iterator of UTF-8 encoded chunks
+    """
+    return _buffer_chunks(_iter_json_pieces(data), chunk_bytes)
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]], chunk_bytes: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode rows as newline-delimited JSON (one object per line).
+
+    Args:
+        rows: Iterable of row dicts
+        chunk_bytes: Approximate size of each yielded chunk
+
+    Returns:
+        Iterator of UTF-8 encoded chunks
+    """
+    return _buffer_chunks((json.dumps(row, ensure_ascii=False, separators=_COMPACT) + "\n" for row in rows), chunk_bytes)
+
+
+def send_json_stream(handler: BaseHTTPRequestHandler, status: int, data: Dict[str, Any]):
+    """
+    Send a JSON response incrementally (see iter_json_chunks).
+
+    Headers are sent before the body is produced, so errors raised while
+    streaming cannot change the status code; report them inside the body.
+
+    Args:
+        handler: HTTP request handler
+        status: HTTP status code
+        data: Response data, possibly containing row iterators
+    """
+    handler.send_response(status)
+    handler.send_header("Content-type", "application/json")
+    handler.end_headers()
+    for chunk in iter_json_chunks(data):
+        handler.wfile.write(chunk)
+
+
+def query_flag(path: str, name: str) -> bool:
+    """
+    Read a boolean query parameter (1, true or yes) from a request path.
+
+    Args:
+        path: Request path including the query string
+        name: Parameter name
+
+    Returns:
+        True if the parameter is set to a truthy value
+    """
+    values = urllib.parse.parse_qs(urllib.parse.urlparse(path).query).get(name)
+    return bool(values) and values[-1].lower() in ("1", "true", "yes")
+
+
 def parse_csv(file_contents: bytes, encoding: str = "utf-8") -> pd.DataFrame:
     """
     Parse CSV file contents with fallback encoding.
@@ -84,6 +193,123 @@ def parse_csv(file_contents: bytes, encoding: str = "utf-8") -> pd.DataFrame:
     return df
 
 
+def detect_encoding(fileobj: BinaryIO, prefix_bytes: int = ENCODING_PREFIX_BYTES) -> str:
+    """
+    Detect CSV encoding from a prefix of the file without consuming it.
+
+    Args:
+        fileobj: Seekable binary file object
+        prefix_bytes: Number of bytes to inspect
+
+    Returns:
+        "utf-8-sig" if the prefix is valid UTF-8 (BOM optional), otherwise "cp949"
+    """
+    position = fileobj.tell()
+    prefix = fileobj.read(prefix_bytes)
+    fileobj.seek(position)
+
+    # Incremental decoding tolerates a multi-byte character cut at the prefix boundary
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        decoder.decode(prefix, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp949"
+
+
+def read_csv_header(fileobj: BinaryIO, encoding: str) -> List[str]:
+    """
+    Read the raw CSV header row without consuming the file.
+
+    Args:
+        fileobj: Seekable binary file object
+        encoding: File encoding
+
+    Returns:
+        List of header names exactly as written in the file
+    """
+    position = fileobj.tell()
+    try:
+        header = pd.read_csv(fileobj, encoding=encoding, nrows=0)
+    finally:
+        fileobj.seek(position)
+    return list(header.columns)
+
+
+def iter_csv_chunks(
+    fileobj: BinaryIO,
+    chunksize: int = None,
+    encoding: str = None,
+    **read_csv_kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file as DataFrame chunks with bounded memory.
+
+    The encoding is detected once from the file prefix, so the file is never
+    parsed twice. Column names are stripped of surrounding whitespace.
+
+    Args:
+        fileobj: Seekable binary file object (e.g. an upload's spooled temp file)
+        chunksize: Rows per chunk (default: CSV_CHUNK_ROWS or 50000)
+        encoding: File encoding (default: detected from the prefix)
+        **read_csv_kwargs: Extra arguments passed to pd.read_csv
+
+    Returns:
+        Iterator of DataFrame chunks
+    """
+    encoding = encoding or detect_encoding(fileobj)
+    reader = pd.read_csv(
+        fileobj,
+        encoding=encoding,
+        chunksize=chunksize or DEFAULT_CHUNK_ROWS,
+        **read_csv_kwargs
+    )
+    with reader:
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+
+
+def clean_numeric_columns(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    """
+    Clean numeric columns by removing commas and converting to numeric.
+
+    Columns that are already a numeric dtype (e.g. parsed by read_csv with
+    thousands=",") only have missing values filled. All remaining text
+    columns are cleaned together in a single pass over their values.
+    Unparseable and missing values become 0.
+
+    Args:
+        df: DataFrame
+        columns: Column names to clean (missing columns are ignored)
+
+    Returns:
+        DataFrame with cleaned columns
+    """
+    present = [col for col in columns if col in df.columns]
+    text_columns = []
+    for col in present:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            if df[col].hasnans:
+                df[col] = df[col].fillna(0)
+        else:
+            text_columns.append(col)
+
+    if text_columns:
+        values = pd.Series(df[text_columns].to_numpy(dtype=object).ravel(order="F"), dtype=str)
+        values = values.str.replace(",", "", regex=False)
+        try:
+            # Strict cast is ~4x faster than to_numeric and tolerates padding
+            parsed = values.astype("float64")
+        except ValueError:
+            parsed = pd.to_numeric(values.str.strip(), errors="coerce")
+        parsed = parsed.fillna(0).to_numpy().reshape((len(df), len(text_columns)), order="F")
+        for i, col in enumerate(text_columns):
+            df[col] = parsed[:, i]
+
+    return df
+
+
 def clean_numeric_column(df: pd.DataFrame, column: str) -> pd.DataFrame:
     """
     Clean numeric column by removing commas and converting to numeric.
@@ -95,11 +321,40 @@ def clean_numeric_column(df: pd.DataFrame, column: str) -> pd.DataFrame:
     Returns:
         DataFrame with cleaned column
     """
-    if column in df.columns:
-        df[column] = df[column].astype(str).str.replace(",", "").str.strip()
-        df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0)
+    return clean_numeric_columns(df, [column])
 
-    return df
+
+def ingest_stats(rows: int, seconds: float, **extra) -> Dict[str, Any]:
+    """
+    Build a standard throughput report for an ingested table.
+
+    Args:
+        rows: Number of rows written
+        seconds: Elapsed wall-clock seconds
+        **extra: Additional fields to include
+
+    Returns:
+        Dict with rows, seconds, rows_per_sec and any extra fields
+    """
+    return {
+        "rows": rows,
+        **extra,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def dataframe_to_records(df: pd.DataFrame) -> list:
+    """
+    Convert a DataFrame to JSON-safe row dicts (NaN becomes None).
+
+    Args:
+        df: DataFrame
+
+    Returns:
+        List of row dicts
+    """
+    return df.astype(object).where(df.notna(), None).to_dict("records")
 
 
 def parse_multipart_form(handler: BaseHTTPRequestHandler) -> Dict[str, Any]:
@@ -1,14 +1,23 @@
 """
 Order Data Backend API - FastAPI with Vercel
 """
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
-import io
-import csv
+import sys
 from typing import Optional
-from supabase import create_client
+
+# Add api directory to path for shared _lib imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from _lib.batch import insert_batched
+from _lib.snapshots import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_LIMIT, fetch_snapshot_tables, fetch_table_page, stream_snapshot_tables
+)
+from _lib.supabase import get_client_stats, get_supabase_client
+from _lib.tables import TABLE_SPECS, iter_table_chunks, resolve_columns
+from _lib.utils import dataframe_to_records, iter_json_chunks
 
 app = FastAPI()
 
@@ -22,37 +31,30 @@ app.add_middleware(
 )
 
 def get_supabase():
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    if not url or not key:
+    try:
+        return get_supabase_client()
+    except ValueError:
         raise HTTPException(status_code=500, detail="Supabase not configured")
-    return create_client(url, key)
 
 
-def parse_csv_content(content: bytes) -> list:
-    """Parse CSV content with encoding detection"""
-    try:
-        text = content.decode('utf-8-sig')
-    except:
-        try:
-            text = content.decode('cp949')
-        except:
-            text = content.decode('utf-8', errors='ignore')
+def iter_upload_records(table: str, upload: UploadFile, snapshot_id: int):
+    """Stream an uploaded CSV as insert-ready records, chunk by chunk"""
+    for df in iter_table_chunks(table, upload.file):
+        df["snapshot_id"] = snapshot_id
+        yield from dataframe_to_records(df)
 
-    reader = csv.DictReader(io.StringIO(text))
-    return list(reader)
 
-
-def clean_numeric(value):
-    """Clean numeric value"""
-    if value is None or value == '':
-        return 0
-    if isinstance(value, (int, float)):
-        return value
+def delete_partial_snapshot(supabase, snapshot_id: int):
+    """Best-effort removal of a snapshot whose upload failed part way"""
+    for table in TABLE_SPECS:
+        try:
+            supabase.table(table).delete().eq("snapshot_id", snapshot_id).execute()
+        except Exception:
+            pass
     try:
-        return float(str(value).replace(',', '').strip())
-    except:
-        return 0
+        supabase.table("snapshots").delete().eq("id", snapshot_id).execute()
+    except Exception:
+        pass
 
 
 @app.get("/api")
@@ -60,6 +62,23 @@ def root():
     return {"message": "Order Data API is running"}
 
 
+@app.get("/api/stats")
+def get_stats():
+    """Supabase connection reuse counters for this instance"""
+    return {"data": {"supabase": get_client_stats()}, "error": None}
+
+
+def stream_snapshot(supabase, snapshot):
+    """Stream a snapshot with its rows page by page as they arrive from PostgREST"""
+    errors = {}
+    data = {
+        "snapshot": snapshot,
+        **stream_snapshot_tables(supabase, snapshot["id"], errors),
+        "errors": errors
+    }
+    return StreamingResponse(iter_json_chunks({"data": data, "error": None}), media_type="application/json")
+
+
 @app.get("/api/snapshots")
 def get_snapshots():
     """Get all snapshots"""
@@ -72,8 +91,8 @@ def get_snapshots():
 
 
 @app.get("/api/snapshots/latest")
-def get_latest_snapshot():
-    """Get latest snapshot with all data"""
+def get_latest_snapshot(stream: bool = False):
+    """Get latest snapshot with all data (stream=true streams rows as they are read)"""
     try:
         supabase = get_supabase()
 
@@ -88,36 +107,31 @@ def get_latest_snapshot():
                 "plan_customer": [],
                 "expect_customer": [],
                 "plan_category": [],
-                "actual_sales": []
+                "actual_sales": [],
+                "errors": {}
             }, "error": None}
 
         snapshot = snap_resp.data[0]
         snapshot_id = snapshot["id"]
 
-        # Fetch all related data
-        order_data = supabase.table("order_data").select("*").eq("snapshot_id", snapshot_id).execute()
-        price_table = supabase.table("price_table").select("*").eq("snapshot_id", snapshot_id).execute()
-        plan_customer = supabase.table("plan_customer").select("*").eq("snapshot_id", snapshot_id).execute()
-        expect_customer = supabase.table("expect_customer").select("*").eq("snapshot_id", snapshot_id).execute()
-        plan_category = supabase.table("plan_category").select("*").eq("snapshot_id", snapshot_id).execute()
-        actual_sales = supabase.table("actual_sales").select("*").eq("snapshot_id", snapshot_id).execute()
+        if stream:
+            return stream_snapshot(supabase, snapshot)
+
+        # Fetch all related data concurrently
+        tables, errors = fetch_snapshot_tables(supabase, snapshot_id)
 
         return {"data": {
             "snapshot": snapshot,
-            "order_data": order_data.data or [],
-            "price_table": price_table.data or [],
-            "plan_customer": plan_customer.data or [],
-            "expect_customer": expect_customer.data or [],
-            "plan_category": plan_category.data or [],
-            "actual_sales": actual_sales.data or []
+            **tables,
+            "errors": errors
         }, "error": None}
     except Exception as e:
         return {"data": None, "error": {"message": str(e), "code": "ERROR"}}
 
 
 @app.get("/api/snapshots/{snapshot_id}")
-def get_snapshot(snapshot_id: int):
-    """Get specific snapshot"""
+def get_snapshot(snapshot_id: int, stream: bool = False):
+    """Get specific snapshot (stream=true streams rows as they are read)"""
     try:
         supabase = get_supabase()
 
@@ -128,21 +142,49 @@ def get_snapshot(snapshot_id: int):
 
         snapshot = snap_resp.data[0]
 
-        order_data = supabase.table("order_data").select("*").eq("snapshot_id", snapshot_id).execute()
-        price_table = supabase.table("price_table").select("*").eq("snapshot_id", snapshot_id).execute()
-        plan_customer = supabase.table("plan_customer").select("*").eq("snapshot_id", snapshot_id).execute()
-        expect_customer = supabase.table("expect_customer").select("*").eq("snapshot_id", snapshot_id).execute()
-        plan_category = supabase.table("plan_category").select("*").eq("snapshot_id", snapshot_id).execute()
-        actual_sales = supabase.table("actual_sales").select("*").eq("snapshot_id", snapshot_id).execute()
+        if stream:
+            return stream_snapshot(supabase, snapshot)
+
+        # Fetch all related data concurrently
+        tables, errors = fetch_snapshot_tables(supabase, snapshot_id)
 
         return {"data": {
             "snapshot": snapshot,
-            "order_data": order_data.data or [],
-            "price_table": price_table.data or [],
-            "plan_customer": plan_customer.data or [],
-            "expect_customer": expect_customer.data or [],
-            "plan_category": plan_category.data or [],
-            "actual_sales": actual_sales.data or []
+            **tables,
+            "errors": errors
+        }, "error": None}
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {"data": None, "error": {"message": str(e), "code": "ERROR"}}
+
+
+@app.get("/api/snapshots/{snapshot_id}/{table}")
+def get_snapshot_table(
+    snapshot_id: int,
+    table: str,
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_LIMIT),
+    columns: Optional[str] = None
+):
+    """Get one page of a snapshot table (keyset pagination on id)"""
+    if table not in TABLE_SPECS:
+        raise HTTPException(status_code=404, detail="Table not found")
+    try:
+        selected = resolve_columns(table, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        supabase = get_supabase()
+        rows, next_cursor = fetch_table_page(supabase, table, snapshot_id, selected, cursor, limit)
+
+        return {"data": {
+            "snapshot_id": snapshot_id,
+            "table": table,
+            "columns": ["id", *selected],
+            "rows": rows,
+            "next_cursor": next_cursor
         }, "error": None}
     except HTTPException:
         raise
@@ -160,7 +202,14 @@ async def upload_files(
     plan_category_file: Optional[UploadFile] = File(None),
     actual_sales_file: Optional[UploadFile] = File(None)
 ):
-    """Upload CSV files and create snapshot"""
+    """
+    Upload CSV files and create snapshot
+
+    Runs inside the request because serverless instances are frozen once the
+    response is sent. If any table fails, the rows already written and the
+    snapshot row are deleted so no half-written snapshot is left behind.
+    """
+    snapshot_id = None
     try:
         supabase = get_supabase()
 
@@ -174,132 +223,36 @@ async def upload_files(
 
         snapshot_id = snap_resp.data[0]["id"]
         rows_saved = 0
-
-        # Process order_file
-        if order_file:
-            content = await order_file.read()
-            rows = parse_csv_content(content)
-            for row in rows:
-                supabase.table("order_data").insert({
-                    "snapshot_id": snapshot_id,
-                    "creation_date": row.get("생성일", row.get("creation_date", "")),
-                    "customer_code": row.get("고객약호", row.get("customer_code", "")),
-                    "sales_team": row.get("영업팀명", row.get("sales_team", "")),
-                    "material_code": row.get("자재", row.get("material_code", "")),
-                    "category_name": row.get("중분류명", row.get("category_name", "")),
-                    "backlog_qty": clean_numeric(row.get("미납잔량", row.get("backlog_qty", 0))),
-                    "unit_price": clean_numeric(row.get("단가", row.get("unit_price", 0))),
-                    "delivery_date": row.get("변경납기일", row.get("delivery_date", ""))
-                }).execute()
-                rows_saved += 1
-
-        # Process price_file
-        if price_file:
-            content = await price_file.read()
-            rows = parse_csv_content(content)
-            for row in rows:
-                supabase.table("price_table").insert({
-                    "snapshot_id": snapshot_id,
-                    "category_code": row.get("관리유형코드(중)", row.get("category_code", "")),
-                    "average_price": clean_numeric(row.get("평균단가", row.get("average_price", 0)))
-                }).execute()
-                rows_saved += 1
-
-        # Process plan_customer_file
-        if plan_customer_file:
-            content = await plan_customer_file.read()
-            rows = parse_csv_content(content)
-            for row in rows:
-                supabase.table("plan_customer").insert({
-                    "snapshot_id": snapshot_id,
-                    "customer": row.get("고객사", row.get("customer", "")),
-                    "year_total": clean_numeric(row.get("2025년", row.get("year_total", 0))),
-                    "month_01": clean_numeric(row.get("1월", row.get("month_01", 0))),
-                    "month_02": clean_numeric(row.get("2월", row.get("month_02", 0))),
-                    "month_03": clean_numeric(row.get("3월", row.get("month_03", 0))),
-                    "month_04": clean_numeric(row.get("4월", row.get("month_04", 0))),
-                    "month_05": clean_numeric(row.get("5월", row.get("month_05", 0))),
-                    "month_06": clean_numeric(row.get("6월", row.get("month_06", 0))),
-                    "month_07": clean_numeric(row.get("7월", row.get("month_07", 0))),
-                    "month_08": clean_numeric(row.get("8월", row.get("month_08", 0))),
-                    "month_09": clean_numeric(row.get("9월", row.get("month_09", 0))),
-                    "month_10": clean_numeric(row.get("10월", row.get("month_10", 0))),
-                    "month_11": clean_numeric(row.get("11월", row.get("month_11", 0))),
-                    "month_12": clean_numeric(row.get("12월", row.get("month_12", 0)))
-                }).execute()
-                rows_saved += 1
-
-        # Process expect_customer_file
-        if expect_customer_file:
-            content = await expect_customer_file.read()
-            rows = parse_csv_content(content)
-            for row in rows:
-                supabase.table("expect_customer").insert({
-                    "snapshot_id": snapshot_id,
-                    "customer": row.get("고객사", row.get("customer", "")),
-                    "year_total": clean_numeric(row.get("2025년", row.get("year_total", 0))),
-                    "month_01": clean_numeric(row.get("1월", row.get("month_01", 0))),
-                    "month_02": clean_numeric(row.get("2월", row.get("month_02", 0))),
-                    "month_03": clean_numeric(row.get("3월", row.get("month_03", 0))),
-                    "month_04": clean_numeric(row.get("4월", row.get("month_04", 0))),
-                    "month_05": clean_numeric(row.get("5월", row.get("month_05", 0))),
-                    "month_06": clean_numeric(row.get("6월", row.get("month_06", 0))),
-                    "month_07": clean_numeric(row.get("7월", row.get("month_07", 0))),
-                    "month_08": clean_numeric(row.get("8월", row.get("month_08", 0))),
-                    "month_09": clean_numeric(row.get("9월", row.get("month_09", 0))),
-                    "month_10": clean_numeric(row.get("10월", row.get("month_10", 0))),
-                    "month_11": clean_numeric(row.get("11월", row.get("month_11", 0))),
-                    "month_12": clean_numeric(row.get("12월", row.get("month_12", 0)))
-                }).execute()
-                rows_saved += 1
-
-        # Process plan_category_file
-        if plan_category_file:
-            content = await plan_category_file.read()
-            rows = parse_csv_content(content)
-            for row in rows:
-                supabase.table("plan_category").insert({
-                    "snapshot_id": snapshot_id,
-                    "category": row.get("중분류", row.get("category", "")),
-                    "year_total": clean_numeric(row.get("2025년", row.get("year_total", 0))),
-                    "month_01": clean_numeric(row.get("1월", row.get("month_01", 0))),
-                    "month_02": clean_numeric(row.get("2월", row.get("month_02", 0))),
-                    "month_03": clean_numeric(row.get("3월", row.get("month_03", 0))),
-                    "month_04": clean_numeric(row.get("4월", row.get("month_04", 0))),
-                    "month_05": clean_numeric(row.get("5월", row.get("month_05", 0))),
-                    "month_06": clean_numeric(row.get("6월", row.get("month_06", 0))),
-                    "month_07": clean_numeric(row.get("7월", row.get("month_07", 0))),
-                    "month_08": clean_numeric(row.get("8월", row.get("month_08", 0))),
-                    "month_09": clean_numeric(row.get("9월", row.get("month_09", 0))),
-                    "month_10": clean_numeric(row.get("10월", row.get("month_10", 0))),
-                    "month_11": clean_numeric(row.get("11월", row.get("month_11", 0))),
-                    "month_12": clean_numeric(row.get("12월", row.get("month_12", 0)))
-                }).execute()
-                rows_saved += 1
-
-        # Process actual_sales_file
-        if actual_sales_file:
-            content = await actual_sales_file.read()
-            rows = parse_csv_content(content)
-            for row in rows:
-                supabase.table("actual_sales").insert({
-                    "snapshot_id": snapshot_id,
-                    "customer_code": row.get("고객약호", row.get("customer_code", "")),
-                    "category_name": row.get("중분류명", row.get("category_name", "")),
-                    "sales_amount": clean_numeric(row.get("매출", row.get("sales_amount", 0))),
-                    "invoice_date": row.get("대금청구일", row.get("invoice_date", ""))
-                }).execute()
-                rows_saved += 1
+        table_stats = {}
+
+        uploads = {
+            "order_file": order_file,
+            "price_file": price_file,
+            "plan_customer_file": plan_customer_file,
+            "expect_customer_file": expect_customer_file,
+            "plan_category_file": plan_category_file,
+            "actual_sales_file": actual_sales_file,
+        }
+        for table, spec in TABLE_SPECS.items():
+            upload = uploads[spec.form_field]
+            if not upload:
+                continue
+            stats = insert_batched(supabase, table, iter_upload_records(table, upload, snapshot_id))
+            table_stats[table] = stats
+            rows_saved += stats["rows"]
 
         return {
             "data": {
                 "message": "Snapshot created successfully",
                 "snapshot_id": snapshot_id,
-                "rows_saved": rows_saved
+                "rows_saved": rows_saved,
+                "tables": table_stats
             },
             "error": None
         }
     except HTTPException:
         raise
     except Exception as e:
+        if snapshot_id is not None:
+            delete_partial_snapshot(supabase, snapshot_id)
         return {"data": None, "error": {"message": str(e), "code": "ERROR"}}
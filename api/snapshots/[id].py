@@ -14,14 +14,15 @@ import urllib.parse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from _lib.supabase import get_supabase_client
+from _lib.snapshots import fetch_snapshot_tables, stream_snapshot_tables
 from _lib.auth import require_auth, require_admin
-from _lib.utils import success_response, error_response, send_json_response
+from _lib.utils import success_response, error_response, send_json_response, send_json_stream, query_flag
 
 
 def get_snapshot_id_from_path(path: str) -> int:
     """Extract snapshot ID from URL path"""
-    # Parse path like /api/snapshots/123
-    parts = path.strip("/").split("/")
+    # Parse path like /api/snapshots/123 (ignoring any query string)
+    parts = urllib.parse.urlparse(path).path.strip("/").split("/")
     if len(parts) >= 3:
         try:
             return int(parts[-1])
@@ -35,8 +36,13 @@ class handler(BaseHTTPRequestHandler):
         """
         Get a specific snapshot with all related data.
 
+        Query parameters:
+            stream: If true, rows are streamed as they are read instead of
+                being loaded first (same JSON shape)
+
         Returns:
-            Object containing snapshot and all related table data
+            Object containing snapshot, all related table data and an
+            errors object for tables that failed or timed out
         """
         try:
             snapshot_id = get_snapshot_id_from_path(self.path)
@@ -58,53 +64,25 @@ class handler(BaseHTTPRequestHandler):
 
             snapshot = snapshot_response.data[0]
 
-            # Fetch all related data
+            if query_flag(self.path, "stream"):
+                # Stream rows page by page as they arrive from PostgREST
+                errors = {}
+                result = {
+                    "snapshot": snapshot,
+                    **stream_snapshot_tables(supabase, snapshot_id, errors),
+                    "errors": errors
+                }
+                send_json_stream(self, 200, success_response(result))
+                return
+
+            # Fetch all related data concurrently
+            tables, errors = fetch_snapshot_tables(supabase, snapshot_id)
             result = {
-                "snapshot": snapshot
+                "snapshot": snapshot,
+                **tables,
+                "errors": errors
             }
 
-            # Fetch order_data
-            order_data = supabase.table("order_data") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["order_data"] = order_data.data if order_data.data else []
-
-            # Fetch price_table
-            price_table = supabase.table("price_table") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["price_table"] = price_table.data if price_table.data else []
-
-            # Fetch plan_customer
-            plan_customer = supabase.table("plan_customer") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["plan_customer"] = plan_customer.data if plan_customer.data else []
-
-            # Fetch expect_customer
-            expect_customer = supabase.table("expect_customer") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["expect_customer"] = expect_customer.data if expect_customer.data else []
-
-            # Fetch plan_category
-            plan_category = supabase.table("plan_category") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["plan_category"] = plan_category.data if plan_category.data else []
-
-            # Fetch actual_sales
-            actual_sales = supabase.table("actual_sales") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["actual_sales"] = actual_sales.data if actual_sales.data else []
-
             send_json_response(self, 200, success_response(result))
 
         except ValueError as e:
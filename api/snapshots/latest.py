@@ -9,8 +9,9 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from _lib.supabase import get_supabase_client
+from _lib.snapshots import fetch_snapshot_tables, stream_snapshot_tables
 from _lib.auth import require_auth
-from _lib.utils import success_response, error_response, send_json_response
+from _lib.utils import success_response, error_response, send_json_response, send_json_stream, query_flag
 
 
 class handler(BaseHTTPRequestHandler):
@@ -18,6 +19,10 @@ class handler(BaseHTTPRequestHandler):
         """
         Get the latest snapshot with all related data.
 
+        Query parameters:
+            stream: If true, rows are streamed as they are read instead of
+                being loaded first (same JSON shape)
+
         Returns:
             Object containing:
             - snapshot: Snapshot metadata
@@ -27,6 +32,8 @@ class handler(BaseHTTPRequestHandler):
             - expect_customer: List of customer expectation records
             - plan_category: List of category plan records
             - actual_sales: List of actual sales records
+            - errors: Error message per table that failed or timed out
+              (those tables are returned empty)
         """
         try:
             supabase = get_supabase_client()
@@ -47,7 +54,8 @@ class handler(BaseHTTPRequestHandler):
                     "plan_customer": [],
                     "expect_customer": [],
                     "plan_category": [],
-                    "actual_sales": []
+                    "actual_sales": [],
+                    "errors": {}
                 }
                 send_json_response(self, 200, success_response(result))
                 return
@@ -55,53 +63,25 @@ class handler(BaseHTTPRequestHandler):
             snapshot = snapshot_response.data[0]
             snapshot_id = snapshot["id"]
 
-            # Fetch all related data
+            if query_flag(self.path, "stream"):
+                # Stream rows page by page as they arrive from PostgREST
+                errors = {}
+                result = {
+                    "snapshot": snapshot,
+                    **stream_snapshot_tables(supabase, snapshot_id, errors),
+                    "errors": errors
+                }
+                send_json_stream(self, 200, success_response(result))
+                return
+
+            # Fetch all related data concurrently
+            tables, errors = fetch_snapshot_tables(supabase, snapshot_id)
             result = {
-                "snapshot": snapshot
+                "snapshot": snapshot,
+                **tables,
+                "errors": errors
             }
 
-            # Fetch order_data
-            order_data = supabase.table("order_data") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["order_data"] = order_data.data if order_data.data else []
-
-            # Fetch price_table
-            price_table = supabase.table("price_table") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["price_table"] = price_table.data if price_table.data else []
-
-            # Fetch plan_customer
-            plan_customer = supabase.table("plan_customer") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["plan_customer"] = plan_customer.data if plan_customer.data else []
-
-            # Fetch expect_customer
-            expect_customer = supabase.table("expect_customer") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["expect_customer"] = expect_customer.data if expect_customer.data else []
-
-            # Fetch plan_category
-            plan_category = supabase.table("plan_category") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["plan_category"] = plan_category.data if plan_category.data else []
-
-            # Fetch actual_sales
-            actual_sales = supabase.table("actual_sales") \
-                .select("*") \
-                .eq("snapshot_id", snapshot_id) \
-                .execute()
-            result["actual_sales"] = actual_sales.data if actual_sales.data else []
-
             send_json_response(self, 200, success_response(result))
 
         except Exception as e:
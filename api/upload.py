@@ -14,7 +14,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from _lib.supabase import get_supabase_client
 from _lib.auth import require_admin
-from _lib.utils import success_response, error_response, send_json_response, parse_csv, clean_numeric_column
+from _lib.utils import success_response, error_response, send_json_response, dataframe_to_records
+from _lib.batch import insert_batched
+from _lib.tables import TABLE_SPECS, iter_table_chunks
 
 
 class handler(BaseHTTPRequestHandler):
@@ -74,164 +76,18 @@ class handler(BaseHTTPRequestHandler):
 
             # Process each CSV file
             try:
-                # 1. Order Data
-                if "order_file" in form:
-                    order_file = form["order_file"]
-                    if order_file.file:
-                        file_contents = order_file.file.read()
-                        df = parse_csv(file_contents)
-
-                        # Map Korean column names to English
-                        column_mapping = {
-                            "생성일": "creation_date",
-                            "고객약호": "customer_code",
-                            "영업팀명": "sales_team",
-                            "자재": "material_code",
-                            "중분류명": "category_name",
-                            "미납잔량": "backlog_qty",
-                            "단가": "unit_price",
-                            "변경납기일": "delivery_date"
-                        }
-                        df = df.rename(columns=column_mapping)
-
-                        # Clean numeric columns
-                        df = clean_numeric_column(df, "backlog_qty")
-                        df = clean_numeric_column(df, "unit_price")
-
-                        # Add snapshot_id
-                        df["snapshot_id"] = snapshot_id
-
-                        # Insert into database
-                        records = df.to_dict("records")
-                        if records:
-                            supabase.table("order_data").insert(records).execute()
-                            total_rows += len(records)
-
-                # 2. Price Table
-                if "price_file" in form:
-                    price_file = form["price_file"]
-                    if price_file.file:
-                        file_contents = price_file.file.read()
-                        df = parse_csv(file_contents)
-
-                        column_mapping = {
-                            "관리유형코드(중)": "category_code",
-                            "중분류": "category_code",
-                            "평균단가": "average_price"
-                        }
-                        df = df.rename(columns=column_mapping)
-                        df = clean_numeric_column(df, "average_price")
+                for table, spec in TABLE_SPECS.items():
+                    if spec.form_field not in form:
+                        continue
+                    upload_file = form[spec.form_field]
+                    if not upload_file.file:
+                        continue
+
+                    # Stream the file in chunks; each chunk is written before the next is read
+                    for df in iter_table_chunks(table, upload_file.file):
                         df["snapshot_id"] = snapshot_id
-
-                        records = df.to_dict("records")
-                        if records:
-                            supabase.table("price_table").insert(records).execute()
-                            total_rows += len(records)
-
-                # 3. Plan Customer
-                if "plan_customer_file" in form:
-                    plan_customer_file = form["plan_customer_file"]
-                    if plan_customer_file.file:
-                        file_contents = plan_customer_file.file.read()
-                        df = parse_csv(file_contents)
-
-                        column_mapping = {
-                            "고객사": "customer",
-                            "2025년": "year_total",
-                            "1월": "month_01", "2월": "month_02", "3월": "month_03",
-                            "4월": "month_04", "5월": "month_05", "6월": "month_06",
-                            "7월": "month_07", "8월": "month_08", "9월": "month_09",
-                            "10월": "month_10", "11월": "month_11", "12월": "month_12"
-                        }
-                        df = df.rename(columns=column_mapping)
-
-                        # Clean numeric columns
-                        numeric_cols = ["year_total"] + [f"month_{i:02d}" for i in range(1, 13)]
-                        for col in numeric_cols:
-                            df = clean_numeric_column(df, col)
-
-                        df["snapshot_id"] = snapshot_id
-                        records = df.to_dict("records")
-                        if records:
-                            supabase.table("plan_customer").insert(records).execute()
-                            total_rows += len(records)
-
-                # 4. Expect Customer
-                if "expect_customer_file" in form:
-                    expect_customer_file = form["expect_customer_file"]
-                    if expect_customer_file.file:
-                        file_contents = expect_customer_file.file.read()
-                        df = parse_csv(file_contents)
-
-                        column_mapping = {
-                            "고객사": "customer",
-                            "2025년": "year_total",
-                            "1월": "month_01", "2월": "month_02", "3월": "month_03",
-                            "4월": "month_04", "5월": "month_05", "6월": "month_06",
-                            "7월": "month_07", "8월": "month_08", "9월": "month_09",
-                            "10월": "month_10", "11월": "month_11", "12월": "month_12"
-                        }
-                        df = df.rename(columns=column_mapping)
-
-                        numeric_cols = ["year_total"] + [f"month_{i:02d}" for i in range(1, 13)]
-                        for col in numeric_cols:
-                            df = clean_numeric_column(df, col)
-
-                        df["snapshot_id"] = snapshot_id
-                        records = df.to_dict("records")
-                        if records:
-                            supabase.table("expect_customer").insert(records).execute()
-                            total_rows += len(records)
-
-                # 5. Plan Category
-                if "plan_category_file" in form:
-                    plan_category_file = form["plan_category_file"]
-                    if plan_category_file.file:
-                        file_contents = plan_category_file.file.read()
-                        df = parse_csv(file_contents)
-
-                        column_mapping = {
-                            "중분류": "category",
-                            "중분류명": "category",
-                            "2025년": "year_total",
-                            "1월": "month_01", "2월": "month_02", "3월": "month_03",
-                            "4월": "month_04", "5월": "month_05", "6월": "month_06",
-                            "7월": "month_07", "8월": "month_08", "9월": "month_09",
-                            "10월": "month_10", "11월": "month_11", "12월": "month_12"
-                        }
-                        df = df.rename(columns=column_mapping)
-
-                        numeric_cols = ["year_total"] + [f"month_{i:02d}" for i in range(1, 13)]
-                        for col in numeric_cols:
-                            df = clean_numeric_column(df, col)
-
-                        df["snapshot_id"] = snapshot_id
-                        records = df.to_dict("records")
-                        if records:
-                            supabase.table("plan_category").insert(records).execute()
-                            total_rows += len(records)
-
-                # 6. Actual Sales
-                if "actual_sales_file" in form:
-                    actual_sales_file = form["actual_sales_file"]
-                    if actual_sales_file.file:
-                        file_contents = actual_sales_file.file.read()
-                        df = parse_csv(file_contents)
-
-                        column_mapping = {
-                            "고객약호": "customer_code",
-                            "중분류명": "category_name",
-                            "매출": "sales_amount",
-                            "대금청구일": "invoice_date"
-                        }
-                        df = df.rename(columns=column_mapping)
-                        df = clean_numeric_column(df, "sales_amount")
-                        df["snapshot_id"] = snapshot_id
-
-                        records = df.to_dict("records")
-                        if records:
-                            supabase.table("actual_sales").insert(records).execute()
-                            total_rows += len(records)
+                        stats = insert_batched(supabase, table, dataframe_to_records(df))
+                        total_rows += stats["rows"]
 
                 # Success response
                 send_json_response(
@@ -0,0 +1,90 @@
+"""
+Microbenchmark: numeric column cleaning on the plan-table shape
+
+Compares the previous per-column chain (astype(str) -> replace(",") ->
+strip -> to_numeric(coerce) -> fillna(0), one column at a time) with
+clean_numeric_columns on 200k rows x 13 comma-formatted monthly columns,
+and checks that both give the same values. Best of --repeat runs.
+
+    python bench/clean_numeric.py
+    python bench/clean_numeric.py --rows 500000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from _lib.tables import iter_table_chunks  # noqa: E402
+from _lib.utils import clean_numeric_columns  # noqa: E402
+
+MONTHLY_COLUMNS = ["2025년"] + [f"{i}월" for i in range(1, 13)]
+
+
+def clean_numeric_column_chain(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Previous clean_numeric_column implementation (baseline)."""
+    if column in df.columns:
+        df[column] = df[column].astype(str).str.replace(",", "").str.strip()
+        df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0)
+
+    return df
+
+
+def clean_chain(df: pd.DataFrame) -> pd.DataFrame:
+    for column in MONTHLY_COLUMNS:
+        clean_numeric_column_chain(df, column)
+    return df
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_numeric_column vs clean_numeric_columns")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({"고객사": [f"CU{i % 300}" for i in range(args.rows)]})
+    for column in MONTHLY_COLUMNS:
+        raw[column] = [f"{v:,}" for v in rng.integers(0, 10**7, args.rows)]
+    csv = raw.to_csv(index=False).encode("utf-8-sig")
+    numeric = clean_numeric_columns(raw.copy(), MONTHLY_COLUMNS)
+
+    expected = clean_chain(raw.copy())[MONTHLY_COLUMNS].to_numpy()
+    assert (numeric[MONTHLY_COLUMNS].to_numpy() == expected).all(), "results differ"
+
+    def read_chain():
+        return clean_chain(pd.read_csv(io.BytesIO(csv), encoding="utf-8-sig", dtype=str))
+
+    def read_spec():
+        return pd.concat(list(iter_table_chunks("plan_customer", io.BytesIO(csv))))
+
+    cases = [
+        ("text columns", lambda: clean_chain(raw.copy()),
+         lambda: clean_numeric_columns(raw.copy(), MONTHLY_COLUMNS)),
+        ("read + clean (full)", read_chain, read_spec),
+        ("already-numeric input", lambda: clean_chain(numeric.copy()),
+         lambda: clean_numeric_columns(numeric.copy(), MONTHLY_COLUMNS)),
+    ]
+    print(f"{args.rows:,} rows x {len(MONTHLY_COLUMNS)} columns, best of {args.repeat}")
+    for name, old, new in cases:
+        old_seconds, new_seconds = best_of(old, args.repeat), best_of(new, args.repeat)
+        print(f"  {name:<22} old {old_seconds:6.2f}s  new {new_seconds:6.2f}s  "
+              f"({args.rows / old_seconds:,.0f} -> {args.rows / new_seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
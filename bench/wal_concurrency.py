@@ -0,0 +1,131 @@
+"""
+업로드(대량 PATCH) 중 스냅샷 페이지 읽기 동시성 벤치마크
+
+스냅샷 1을 keyset 페이지로 계속 읽는 프로세스들을 띄운 뒤, 스냅샷 2의 order_data를
+한 트랜잭션으로 교체합니다. 교체 전(대기)과 교체 중의 읽기 횟수, 오류("database is locked"),
+지연 시간을 나눠 출력합니다.
+
+    python bench/wal_concurrency.py                    # 현재 SQLITE_PRAGMAS 기본값 (WAL)
+    python bench/wal_concurrency.py --profile legacy   # 이전 기본값 (rollback journal, pysqlite 기본 설정)
+
+임시 디렉터리에 DB를 새로 만들어 실행하므로 작업 디렉터리의 data.db는 건드리지 않습니다.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SQLITE_PRAGMAS를 이전(SQLite/pysqlite 기본값)과 같게 되돌리는 환경변수
+LEGACY_PRAGMAS = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_CACHE_SIZE": "-2000",
+    "SQLITE_TEMP_STORE": "DEFAULT",
+    "SQLITE_BUSY_TIMEOUT_MS": "5000",
+}
+
+
+def order_csv(path, n, seed):
+    """TABLE_SPECS 원본 컬럼명으로 된 주문 CSV"""
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        '생성일': '2025-01-01',
+        '고객약호': rng.choice([f"CU{i}" for i in range(300)], n),
+        '영업팀명': rng.choice(['T1', 'T2'], n),
+        '자재': rng.choice(['9001', '9002', '1001'], n),
+        '중분류명': rng.choice([f"C{i}" for i in range(20)], n),
+        '미납잔량': [f"{x:,}" for x in rng.integers(0, 100, n) * 1000],
+        '단가': rng.choice([0, 100000, 2500000.5], n),
+        '변경납기일': (pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 500, n), 'D')).strftime('%Y-%m-%d'),
+    }).to_csv(path, index=False)
+    return path
+
+
+def read_pages(snapshot_id, page_size, stop, results):
+    """stop이 설정될 때까지 snapshot_id의 order_data를 keyset 페이지로 반복해서 읽음"""
+    sys.path.insert(0, ROOT)
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app, raise_server_exceptions=False)
+    reads, cursor = [], None
+    while not stop.is_set():
+        url = f"/snapshots/{snapshot_id}/order_data?limit={page_size}"
+        if cursor is not None:
+            url += f"&cursor={cursor}"
+        started = time.time()
+        response = client.get(url)
+        reads.append((started, time.time() - started, response.status_code != 200))
+        if response.status_code == 200:
+            cursor = response.json()["next_cursor"]
+    results.put(reads)
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=["current", "legacy"], default="current",
+                        help="legacy: SQLITE_PRAGMAS 도입 전 기본값으로 실행")
+    parser.add_argument("--readers", type=int, default=2, help="읽기 프로세스 수")
+    parser.add_argument("--read-rows", type=int, default=20_000, help="읽기 대상 스냅샷 1의 주문 행 수")
+    parser.add_argument("--patch-rows", type=int, default=200_000, help="PATCH로 교체하는 스냅샷 2의 주문 행 수")
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    # main.py는 import 시 환경변수와 현재 디렉터리(data.db)를 읽으므로 먼저 설정
+    if args.profile == "legacy":
+        os.environ.update(LEGACY_PRAGMAS)
+    os.chdir(tempfile.mkdtemp(prefix="wal-bench-"))
+    sys.path.insert(0, ROOT)
+    import main
+
+    first = main.ingest_snapshot_upload({'order_data': order_csv('read.csv', args.read_rows, 0)}, 'read')
+    second = main.ingest_snapshot_upload({'order_data': order_csv('old.csv', 1000, 1)}, 'patch target')
+    order_csv('patch.csv', args.patch_rows, 2)
+
+    context = multiprocessing.get_context("spawn")
+    stop, results = context.Event(), context.Queue()
+    readers = [
+        context.Process(target=read_pages, args=(first['snapshot_id'], args.page_size, stop, results))
+        for _ in range(args.readers)
+    ]
+    for reader in readers:
+        reader.start()
+    time.sleep(5)  # 읽기 프로세스가 import를 마치고 대기 상태 읽기를 쌓을 때까지
+
+    patch_started = time.time()
+    with open('patch.csv', 'rb') as fileobj:
+        main.update_snapshot_tables(second['snapshot_id'], {'order_data': fileobj})
+    patch_finished = time.time()
+
+    stop.set()
+    reads = pd.DataFrame(
+        [read for _ in readers for read in results.get()], columns=['started', 'seconds', 'error']
+    )
+    for reader in readers:
+        reader.join()
+
+    mode = main.SQLITE_PRAGMAS["journal_mode"]
+    print(f"profile={args.profile} journal_mode={mode} readers={args.readers} patch_rows={args.patch_rows}")
+    print(f"  patch          {patch_finished - patch_started:.2f}s")
+    phases = {
+        "idle": reads[reads['started'] < patch_started],
+        "during patch": reads[(reads['started'] >= patch_started) & (reads['started'] < patch_finished)],
+    }
+    for phase, df in phases.items():
+        ms = df['seconds'] * 1000
+        line = f"  {phase:<14} reads {len(df):>5}  errors {int(df['error'].sum()):>3}"
+        if len(df):
+            line += f"  p50 {ms.quantile(0.5):.0f}ms  p99 {ms.quantile(0.99):.0f}ms  max {ms.max():.0f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main_()
@@ -1,20 +1,74 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Union
+from typing import List, Literal, Optional, Union
 from datetime import date, datetime
 import pandas as pd
 import numpy as np
+import asyncio
+import hashlib
 import io
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, ForeignKey
+import logging
+import os
+import queue
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from sqlalchemy import create_engine, event, Column, Index, Integer, String, Float, Text, ForeignKey, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+# api/_lib 공유 모듈 사용
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+
+from _lib.snapshots import DEFAULT_PAGE_SIZE, MAX_PAGE_LIMIT
+from _lib.tables import TABLE_SPECS, iter_table_chunks, resolve_columns
+from _lib.utils import clean_numeric_columns, dataframe_to_records, ingest_stats, iter_json_chunks, iter_ndjson
+
 # --- SQLite 데이터베이스 설정 ---
 DATABASE_URL = "sqlite:///./data.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# 모든 연결에 적용하는 SQLite 설정 (환경변수로 조정)
+# WAL: 업로드 중에도 대시보드 읽기가 막히지 않음 (쓰기는 여전히 한 번에 하나)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),  # 음수는 KiB 단위 (64MB)
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "30000")),
+}
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    # FastAPI 스레드풀에서 동시에 읽는 요청 수에 맞춤 (WAL에서는 읽기 연결끼리 서로 막지 않음)
+    pool_size=int(os.environ.get("SQLITE_POOL_SIZE", "10")),
+    max_overflow=int(os.environ.get("SQLITE_POOL_MAX_OVERFLOW", "20")),
+    pool_timeout=30,
+)
+
+
+@event.listens_for(engine, "connect")
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """새 연결마다 SQLITE_PRAGMAS 적용"""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
 
 # --- 데이터베이스 모델 ---
 class Snapshot(Base):
@@ -26,8 +80,13 @@ class Snapshot(Base):
 
 class OrderData(Base):
     __tablename__ = "order_data"
+    # snapshot_id 단독 인덱스는 (snapshot_id, id) 순서라 keyset 페이지 조회에도 쓰임
+    __table_args__ = (
+        Index("ix_order_data_snapshot_filter", "snapshot_id", "delivery_date", "customer_code", "category_name"),
+        Index("ix_order_data_line", "snapshot_id", "line_key"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
     creation_date = Column(Text)
     customer_code = Column(Text)
     sales_team = Column(Text)
@@ -36,12 +95,16 @@ class OrderData(Base):
     backlog_qty = Column(Integer)
     unit_price = Column(Float)
     delivery_date = Column(Text)
+    # 스냅샷 사이에서 같은 주문 라인을 식별하는 키 (ORDER_LINE_KEY_COLUMNS 해시 + 같은 값의 순번)
+    line_key = Column(Integer)
+    # 델타 스냅샷에서 기준 스냅샷 라인이 삭제되었음을 표시 (삭제 표시 행은 값 컬럼이 비어 있음)
+    is_deleted = Column(Integer, nullable=False, server_default="0")
 
 
 class PriceTable(Base):
     __tablename__ = "price_table"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
     category_code = Column(Text)
     average_price = Column(Float)
 
@@ -49,7 +112,7 @@ class PriceTable(Base):
 class PlanCustomer(Base):
     __tablename__ = "plan_customer"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
     customer = Column(Text)
     year_total = Column(Float)
     month_01 = Column(Float)
@@ -69,7 +132,7 @@ class PlanCustomer(Base):
 class ExpectCustomer(Base):
     __tablename__ = "expect_customer"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
     customer = Column(Text)
     year_total = Column(Float)
     month_01 = Column(Float)
@@ -89,7 +152,7 @@ class ExpectCustomer(Base):
 class PlanCategory(Base):
     __tablename__ = "plan_category"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
     category = Column(Text)
     year_total = Column(Float)
     month_01 = Column(Float)
@@ -109,15 +172,194 @@ class PlanCategory(Base):
 class ActualSales(Base):
     __tablename__ = "actual_sales"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
     customer_code = Column(Text)
     category_name = Column(Text)
     sales_amount = Column(Float)
     invoice_date = Column(Text)
 
 
-# 테이블 생성
+class BacklogCube(Base):
+    """스냅샷별 (월 × 고객사 × 중분류) 보정수주액 집계"""
+    __tablename__ = "backlog_cube"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
+    month = Column(Text)
+    customer = Column(Text)
+    category = Column(Text)
+    amount = Column(Float)
+
+
+class SnapshotMetric(Base):
+    """스냅샷별 특수 기간 보정 지표 (12월 예측조정 등). 업로드 시 한 번 계산해 두고 대시보드 집계에 합산"""
+    __tablename__ = "snapshot_metrics"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), index=True)
+    name = Column(Text)
+    month = Column(Text)
+    customer = Column(Text)
+    category = Column(Text)
+    amount = Column(Float)
+
+
+class SnapshotTable(Base):
+    """
+    스냅샷 테이블별 업로드 파일 해시와 행이 실제로 저장된 스냅샷
+
+    같은 내용의 파일이 다시 올라오면 행을 새로 넣지 않고 data_snapshot_id로 기존 행을 가리킴.
+    다른 스냅샷의 행을 가리키는 스냅샷은 자기 자리에 그 테이블 행을 두지 않음.
+    base_snapshot_id가 있으면 data_snapshot_id의 행은 기준 스냅샷에 대한 델타 (order_data만 해당)
+    """
+    __tablename__ = "snapshot_tables"
+    __table_args__ = (
+        Index("ix_snapshot_tables_snapshot", "snapshot_id", "table_name", unique=True),
+        Index("ix_snapshot_tables_content", "table_name", "content_hash"),
+        Index("ix_snapshot_tables_data", "table_name", "data_snapshot_id"),
+        Index("ix_snapshot_tables_base", "table_name", "base_snapshot_id"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    table_name = Column(Text)
+    content_hash = Column(Text)
+    data_snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    base_snapshot_id = Column(Integer, ForeignKey("snapshots.id"))
+    rows = Column(Integer)
+
+
+# 행 위치(공유/델타)는 읽기 문장 안의 서브쿼리로 풀어서, 위치 조회와 행 읽기 사이에
+# 압축이나 공유 행 상속 이동이 커밋되어도 한 시점의 행만 읽도록 함
+SNAPSHOT_DATA_ID = (
+    "COALESCE((SELECT data_snapshot_id FROM snapshot_tables "
+    "WHERE snapshot_id = :snapshot_id AND table_name = :table), :snapshot_id)"
+)
+SNAPSHOT_BASE_ID = (
+    "(SELECT base_snapshot_id FROM snapshot_tables "
+    "WHERE snapshot_id = :snapshot_id AND table_name = :table)"
+)
+
+# 델타 스냅샷: 델타 행(삭제 표시 제외) + 델타에 같은 라인이 없는 기준 스냅샷 행 (서로 겹치지 않음).
+# 전체 저장이면 기준이 NULL이라 두 번째 조건은 행이 없음
+ORDER_DELTA_PARTS = (
+    f"snapshot_id = {SNAPSHOT_DATA_ID} AND is_deleted = 0",
+    f"snapshot_id = {SNAPSHOT_BASE_ID} AND line_key NOT IN "
+    f"(SELECT line_key FROM order_data WHERE snapshot_id = {SNAPSHOT_DATA_ID})",
+)
+
+
+def snapshot_table_parts(table, snapshot_id):
+    """스냅샷 테이블 행을 고르는 WHERE 조건 목록과 파라미터 (공유/델타 위치는 조건 안에서 풀림)"""
+    params = {"snapshot_id": snapshot_id, "table": table}
+    if table == 'order_data':
+        return list(ORDER_DELTA_PARTS), params
+    return [f"snapshot_id = {SNAPSHOT_DATA_ID}"], params
+
+
+def snapshot_table_query(table, snapshot_id, columns, cursor=None, limit=None, ordered=True):
+    """
+    스냅샷 테이블 SELECT 문과 파라미터 (columns는 테이블 스펙에서 온 컬럼명만 들어옴)
+
+    조건마다 따로 SELECT해서 UNION ALL로 합침. ordered면 id가 결과에 포함되고, 조건마다
+    id 인덱스 순서로 읽은 것을 병합하므로 전체 정렬 없이 LIMIT까지만 읽음
+    """
+    parts, params = snapshot_table_parts(table, snapshot_id)
+    if ordered and 'id' not in columns:
+        columns = ['id', *columns]
+    if cursor is not None:
+        parts = [f"{part} AND id > :cursor" for part in parts]
+        params["cursor"] = cursor
+    query = " UNION ALL ".join(f"SELECT {', '.join(columns)} FROM {table} WHERE {part}" for part in parts)
+    if ordered:
+        query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT :limit"
+        params["limit"] = limit
+    return query, params
+
+
+# 스냅샷 조회/삭제에서 full scan이 나오면 안 되는 쿼리
+HOT_QUERIES = [
+    *(
+        (f"{table} by snapshot", f"SELECT * FROM {table} WHERE snapshot_id = :snapshot_id")
+        for table in [*TABLE_SPECS, "backlog_cube", "snapshot_metrics"]
+    ),
+    *(
+        (f"{table} delete", f"DELETE FROM {table} WHERE snapshot_id = :snapshot_id")
+        for table in [*TABLE_SPECS, "backlog_cube", "snapshot_metrics"]
+    ),
+    ("order_data page",
+     "SELECT id, customer_code FROM order_data "
+     "WHERE snapshot_id = :snapshot_id AND id > :cursor ORDER BY id LIMIT 1000"),
+    ("order_data dashboard filter",
+     "SELECT customer_code, category_name, backlog_qty, unit_price FROM order_data "
+     "WHERE snapshot_id = :snapshot_id AND delivery_date BETWEEN :start AND :end "
+     "AND customer_code IN ('A', 'B') AND category_name IN ('C')"),
+    ("order_data delta read",
+     snapshot_table_query('order_data', 0, ['customer_code'], ordered=False)[0]),
+    ("order_data delta page",
+     snapshot_table_query('order_data', 0, ['customer_code'], cursor=0, limit=1000)[0]),
+    ("snapshot_tables resolve",
+     "SELECT data_snapshot_id, base_snapshot_id FROM snapshot_tables "
+     "WHERE snapshot_id = :snapshot_id AND table_name = 'order_data'"),
+    ("snapshot_tables by content",
+     "SELECT data_snapshot_id, base_snapshot_id, rows FROM snapshot_tables "
+     "WHERE table_name = 'price_table' AND content_hash = :content_hash"),
+    ("snapshot_tables referrers",
+     "SELECT snapshot_id FROM snapshot_tables "
+     "WHERE table_name = 'price_table' AND data_snapshot_id = :snapshot_id AND snapshot_id != :snapshot_id"),
+    ("snapshot_tables delta readers",
+     "SELECT snapshot_id FROM snapshot_tables "
+     "WHERE table_name = 'order_data' AND data_snapshot_id = :snapshot_id"),
+    ("snapshot_tables delta dependents",
+     "SELECT DISTINCT data_snapshot_id FROM snapshot_tables "
+     "WHERE table_name = 'order_data' AND base_snapshot_id = :snapshot_id"),
+]
+
+
+def ensure_columns():
+    """모델에 새로 추가된 컬럼을 기존 테이블에 추가 (create_all은 이미 있는 테이블을 바꾸지 않으므로 기존 DB용)"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.exec_driver_sql(ddl)
+
+
+def ensure_indexes():
+    """모델에 선언된 인덱스 생성 (create_all은 이미 있는 테이블의 인덱스를 만들지 않으므로 기존 DB용)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def check_query_plans():
+    """HOT_QUERIES의 EXPLAIN QUERY PLAN을 확인해 full scan/임시 정렬이 있으면 경고"""
+    params = {
+        "snapshot_id": 0, "cursor": 0, "limit": 1000, "table": "order_data",
+        "start": "2025-01-01", "end": "2025-12-31", "content_hash": "",
+    }
+    problems = {}
+    with engine.connect() as conn:
+        for name, query in HOT_QUERIES:
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {query}"), params)]
+            bad = [step for step in plan if step.startswith("SCAN") or "TEMP B-TREE" in step]
+            if bad:
+                problems[name] = plan
+                logger.warning("Query plan for %s is not index-backed: %s", name, " / ".join(plan))
+    return problems
+
+
+# 테이블 및 인덱스 생성
 Base.metadata.create_all(bind=engine)
+ensure_columns()
+ensure_indexes()
+check_query_plans()
 
 # --- Pydantic 모델 ---
 class DashboardFilter(BaseModel):
@@ -149,85 +391,713 @@ class DashboardData(BaseModel):
 # --- FastAPI 앱 설정 ---
 app = FastAPI()
 origins = ["http://localhost:5173", "http://localhost:3000"]
-app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"], expose_headers=["ETag"])
 
 # --- 데이터 처리 함수 ---
-def get_processed_data():
-    # 이 함수는 앱 실행 시 한 번만 데이터를 로드하고 전처리하면 더 효율적입니다.
-    # 여기서는 간단하게 요청 시마다 로드하도록 구현합니다.
-    try:
-        df_order = pd.read_csv(r"C:\Users\sujin.jeon\Downloads\order data.csv", encoding='cp949', low_memory=False)
-        df_price = pd.read_csv(r"C:\Users\sujin.jeon\Downloads\price table.csv", encoding='cp949', low_memory=False)
-        df_actual_sales = pd.read_csv(r"C:\Users\sujin.jeon\Downloads\12m actual_sales.csv", encoding='cp949', low_memory=False)
-    except FileNotFoundError as e:
-        # 실제 운영환경에서는 더 정교한 에러 처리가 필요합니다.
-        raise RuntimeError(f"데이터 파일 로딩 실패: {e}")
+ORDER_CSV_PATH = r"C:\Users\sujin.jeon\Downloads\order data.csv"
+PRICE_CSV_PATH = r"C:\Users\sujin.jeon\Downloads\price table.csv"
+ACTUAL_SALES_CSV_PATH = r"C:\Users\sujin.jeon\Downloads\12m actual_sales.csv"
+
+
+def correct_prices(df_order, df_price):
+    """
+    단가 보정 (컬럼 단위 연산)
+    - 단가가 0이고 총본품수량도 0이면 200
+    - 단가가 0이면 단가표의 중분류 평균단가 (없으면 0)
+    - 그 외에는 원래 단가
+    """
+    # 중분류가 중복되면 dict 변환과 동일하게 마지막 값을 사용
+    price_table = df_price.drop_duplicates(subset='중분류', keep='last').set_index('중분류')['평균단가']
+    # 단가표에 없는 중분류만 0 (단가표 값 자체가 비어 있으면 dict.get처럼 NaN 유지)
+    table_price = df_order['중분류'].map(price_table).where(df_order['중분류'].isin(price_table.index), 0)
+
+    unit_price = df_order['단가']
+    zero_price = (unit_price == 0).to_numpy()
+    # 스냅샷 테이블에는 총본품수량이 없으므로 이 경우 200 규칙은 적용하지 않음
+    if '총본품수량' in df_order.columns:
+        zero_qty = (df_order['총본품수량'] == 0).to_numpy()
+    else:
+        zero_qty = np.zeros(len(df_order), dtype=bool)
+    corrected = np.select(
+        [zero_price & zero_qty, zero_price],
+        [200, table_price.to_numpy(dtype=float)],
+        default=unit_price.to_numpy(dtype=float),
+    )
+    return pd.Series(corrected, index=df_order.index)
 
+
+def build_processed_data(df_order, df_price):
+    """원본 프레임으로부터 대시보드용 전처리 프레임 생성 (예측조정 행은 build_forecast_adjustments에서 따로 계산)"""
     # 전처리
     df_order_processed = df_order.copy()
     df_order_processed = df_order_processed[df_order_processed['자재'].astype(str).str.startswith('9')]
-    df_order_processed = df_order_processed[df_order_processed['일정라인범주'] != 'MRP(MRP Close)']
+    if '일정라인범주' in df_order_processed.columns:
+        df_order_processed = df_order_processed[df_order_processed['일정라인범주'] != 'MRP(MRP Close)']
     
-    df_price_processed = df_price.copy()
-    df_price_processed['평균단가'] = df_price_processed['평균단가'].astype(str).str.replace(',', '').str.strip()
-    df_price_processed['평균단가'] = pd.to_numeric(df_price_processed['평균단가'], errors='coerce').fillna(0)
+    df_price_processed = clean_numeric_columns(df_price.copy(), ['평균단가'])
 
     # 단가 보정
-    price_dict = df_price_processed.set_index('중분류')['평균단가'].to_dict()
-    def correct_price(row):
-        if row['단가'] == 0:
-            if row['총본품수량'] == 0: return 200
-            else: return price_dict.get(row['중분류'], 0)
-        else: return row['단가']
-    df_order_processed['보정단가'] = df_order_processed.apply(correct_price, axis=1)
+    df_order_processed['보정단가'] = correct_prices(df_order_processed, df_price_processed)
     df_order_processed['보정수주액'] = df_order_processed['보정단가'] * df_order_processed['수량']
     
-    # 날짜 변환 및 12월 특별 로직
+    # 날짜 변환
     df_order_processed['납기요청일'] = pd.to_datetime(df_order_processed['납기요청일'], errors='coerce')
     df_order_processed.dropna(subset=['납기요청일'], inplace=True)
-    
-    base_monthly_backlog = df_order_processed.groupby(df_order_processed['납기요청일'].dt.to_period('M'))['보정수주액'].sum()
-    carry_over = base_monthly_backlog[base_monthly_backlog.index < '2025-12'].sum()
+    df_order_processed['납기요청월'] = df_order_processed['납기요청일'].dt.to_period('M')
+
+    return df_order_processed
+
+
+# 예측조정 기준월: 이 달 이전 납기 미납액(이월분)과 실적 매출 합계를 이 달의 예측조정 행으로 반영
+FORECAST_CUTOFF_MONTH = os.environ.get("FORECAST_CUTOFF_MONTH", "2025-12")
+FORECAST_ADJUSTMENT_METRIC = "forecast_adjustment"
+
+
+def forecast_adjustment_label(month):
+    """예측조정 행의 고객사/중분류 이름 (예: '12월 예측조정')"""
+    return f"{pd.Period(month, freq='M').month}월 예측조정"
+
+
+def build_forecast_adjustments(df_final, df_actual_sales, cutoff_month=None):
+    """
+    기준월 예측조정 행 계산 (backlog_cube와 같은 컬럼)
+
+    이월분 = 기준월 이전 납기의 보정수주액 합계, 예측조정 = 이월분 + 실적 매출 합계
+    """
+    cutoff = pd.Period(cutoff_month or FORECAST_CUTOFF_MONTH, freq='M')
+    carry_over = df_final.loc[df_final['납기요청일'] < cutoff.start_time, '보정수주액'].sum()
     actual_sales = df_actual_sales['매출액'].sum()
-    dec_special_value = carry_over + actual_sales
-    
-    df_dec_special = pd.DataFrame([{'납기요청일': datetime(2025, 12, 1), '고객사': '12월 예측조정', '중분류': '12월 예측조정', '보정수주액': dec_special_value}])
-    
-    df_final = pd.concat([df_order_processed, df_dec_special], ignore_index=True)
-    df_final['납기요청월'] = pd.to_datetime(df_final['납기요청일']).dt.to_period('M')
 
-    return df_final
+    label = forecast_adjustment_label(cutoff)
+    return pd.DataFrame([{
+        '납기요청월': str(cutoff),
+        '고객사': label,
+        '중분류': label,
+        '보정수주액': carry_over + actual_sales,
+    }])
+
+
+# category로 바꿀 텍스트 컬럼의 최대 고유값 비율 (고유값이 이보다 많으면 코드표가 오히려 커짐)
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# 합계를 내는 금액 컬럼은 정밀도를 위해 float64 유지
+SUM_COLUMNS = ('보정수주액',)
+
+
+def compact_frame(df):
+    """
+    캐시에 오래 두는 전처리 프레임의 메모리 축소 (제자리 변경 후 반환)
+
+    - 고유값이 적은 텍스트 컬럼은 category (필터/groupby가 정수 코드 비교가 됨)
+    - 정수 값만 있는 숫자 컬럼은 가장 작은 정수형으로 downcast
+    """
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+                df[col] = series.astype('category')
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series) and col not in SUM_COLUMNS:
+            df[col] = pd.to_numeric(series, downcast='integer')
+    return df
+
+
+def sort_by_due_date(df):
+    """납기요청일 순으로 정렬 (filter_order_frame이 기간을 searchsorted로 자를 수 있도록)"""
+    return df.sort_values('납기요청일', kind='stable', ignore_index=True)
+
+
+# 역색인을 만드는 필터 컬럼
+FILTER_INDEX_COLUMNS = ('고객사', '중분류')
+
+
+def build_filter_index(df_final):
+    """
+    필터 컬럼별 역색인 {컬럼: {값: 행 위치 배열}}
+
+    프레임이 납기요청일 순이므로 각 위치 배열도 납기요청일 순 (기간은 searchsorted로 잘라냄)
+    """
+    dtype = np.int32 if len(df_final) <= np.iinfo(np.int32).max else np.int64
+    return {
+        col: {
+            value: positions.astype(dtype)
+            for value, positions in df_final.groupby(col, observed=True, sort=False).indices.items()
+        }
+        for col in FILTER_INDEX_COLUMNS
+    }
+
+
+def frame_memory_stats(df):
+    """프레임 메모리 사용량 (문자열 포함)과 행당 바이트"""
+    total = int(df.memory_usage(deep=True).sum())
+    return {"rows": len(df), "bytes": total, "bytes_per_row": round(total / len(df), 1) if len(df) else None}
+
+
+def build_backlog_cube(df_final):
+    """전처리 프레임을 (납기요청월 × 고객사 × 중분류) 단위로 미리 집계"""
+    months = df_final['납기요청월'].astype(str)
+    # category 컬럼은 observed=True가 없으면 나오지 않은 조합까지 만들어짐
+    cube = df_final.groupby(
+        [months, df_final['고객사'], df_final['중분류']], dropna=False, observed=True
+    )['보정수주액'].sum()
+    return cube.reset_index()
+
+
+# 스냅샷 테이블 컬럼 → 대시보드 전처리 컬럼
+SNAPSHOT_ORDER_COLUMNS = {
+    'material_code': '자재',
+    'customer_code': '고객사',
+    'category_name': '중분류',
+    'sales_team': '영업팀명',
+    'backlog_qty': '수량',
+    'unit_price': '단가',
+    'delivery_date': '납기요청일',
+}
+SNAPSHOT_PRICE_COLUMNS = {'category_code': '중분류', 'average_price': '평균단가'}
+SNAPSHOT_ACTUAL_SALES_COLUMNS = {'sales_amount': '매출액'}
+
+
+# 숫자 컬럼은 읽을 때 바로 float64로 고정 (텍스트 컬럼은 object 그대로)
+SNAPSHOT_NUMERIC_DTYPES = {
+    'backlog_qty': 'float64',
+    'unit_price': 'float64',
+    'average_price': 'float64',
+    'sales_amount': 'float64',
+    'amount': 'float64',
+}
+
+
+def resolve_snapshot_table(table, snapshot_id, con=None):
+    """
+    table 행이 실제로 저장된 위치 (data_snapshot_id, base_snapshot_id)
+
+    같은 파일을 공유하면 원본 스냅샷, 기록이 없으면 자기 자신. base_snapshot_id는 델타일 때만 있음
+    """
+    query = text(
+        "SELECT data_snapshot_id, base_snapshot_id FROM snapshot_tables "
+        "WHERE snapshot_id = :snapshot_id AND table_name = :table"
+    )
+    params = {"snapshot_id": snapshot_id, "table": table}
+    if con is None or con is engine:
+        with engine.connect() as conn:
+            row = conn.execute(query, params).first()
+    else:
+        row = con.execute(query, params).first()
+    return (row[0], row[1]) if row is not None else (snapshot_id, None)
+
+
+def _read_snapshot_table(table, column_mapping, snapshot_id, con):
+    """필요한 컬럼만 SELECT 한 번으로 읽어서 대시보드 컬럼명으로 변경"""
+    query, params = (
+        f"SELECT {', '.join(column_mapping)} FROM {table} WHERE snapshot_id = :snapshot_id",
+        {"snapshot_id": snapshot_id},
+    )
+    if table in TABLE_SPECS:
+        query, params = snapshot_table_query(table, snapshot_id, list(column_mapping), ordered=False)
+    query = text(query)
+    dtype = {col: SNAPSHOT_NUMERIC_DTYPES[col] for col in column_mapping if col in SNAPSHOT_NUMERIC_DTYPES}
+    df = pd.read_sql(query, con, params=params, dtype=dtype)
+    return df.rename(columns=column_mapping)
+
+
+def load_snapshot_frames(snapshot_id, con=None):
+    """스냅샷의 order_data/price_table/actual_sales를 대시보드 컬럼명으로 로드"""
+    con = con if con is not None else engine
+    df_order = _read_snapshot_table('order_data', SNAPSHOT_ORDER_COLUMNS, snapshot_id, con)
+    df_price = _read_snapshot_table('price_table', SNAPSHOT_PRICE_COLUMNS, snapshot_id, con)
+    df_actual_sales = _read_snapshot_table('actual_sales', SNAPSHOT_ACTUAL_SALES_COLUMNS, snapshot_id, con)
+    return df_order, df_price, df_actual_sales
+
+
+BACKLOG_CUBE_COLUMNS = {'month': '납기요청월', 'customer': '고객사', 'category': '중분류', 'amount': '보정수주액'}
+
+
+def load_backlog_cube(snapshot_id, con=None):
+    """저장된 backlog_cube 집계를 대시보드 컬럼명으로 로드"""
+    con = con if con is not None else engine
+    return _read_snapshot_table('backlog_cube', BACKLOG_CUBE_COLUMNS, snapshot_id, con)
+
+
+def load_forecast_adjustments(snapshot_id, cutoff_month=None, con=None):
+    """저장된 기준월 예측조정 지표를 backlog_cube와 같은 컬럼으로 로드 (없으면 빈 프레임)"""
+    con = con if con is not None else engine
+    query = text(
+        "SELECT month, customer, category, amount FROM snapshot_metrics "
+        "WHERE snapshot_id = :snapshot_id AND name = :name AND month = :month"
+    )
+    df = pd.read_sql(query, con, params={
+        "snapshot_id": snapshot_id,
+        "name": FORECAST_ADJUSTMENT_METRIC,
+        "month": cutoff_month or FORECAST_CUTOFF_MONTH,
+    }, dtype={'amount': 'float64'})
+    return df.rename(columns=BACKLOG_CUBE_COLUMNS)
+
+
+def bulk_insert_frame(table, df, conn):
+    """
+    DataFrame을 미리 준비한 INSERT 한 문장으로 executemany 기록 (to_sql보다 빠름)
+
+    테이블은 이미 있으므로 to_sql의 테이블/타입 검사를 건너뛰고,
+    트랜잭션은 호출하는 쪽에서 관리
+    """
+    if df.empty:
+        return 0
+    columns = ", ".join(df.columns)
+    placeholders = ", ".join("?" * len(df.columns))
+    # object로 바꾸면 numpy 값이 파이썬 int/float가 되어 sqlite3가 그대로 받음 (NaN은 NULL)
+    values = [df[col].astype(object).where(df[col].notna(), None).tolist() for col in df.columns]
+    conn.exec_driver_sql(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", list(zip(*values)))
+    return len(df)
+
+
+def rebuild_snapshot_aggregates(snapshot_id, conn):
+    """스냅샷의 backlog_cube 집계와 예측조정 지표를 다시 계산해 저장 (트랜잭션은 호출하는 쪽에서 관리)"""
+    df_order, df_price, df_actual_sales = load_snapshot_frames(snapshot_id, conn)
+    df_final = build_processed_data(df_order, df_price)
+    params = {"snapshot_id": snapshot_id}
+
+    cube = build_backlog_cube(df_final)
+    cube.columns = ['month', 'customer', 'category', 'amount']
+    cube['snapshot_id'] = snapshot_id
+    conn.execute(text("DELETE FROM backlog_cube WHERE snapshot_id = :snapshot_id"), params)
+    rows = bulk_insert_frame('backlog_cube', cube, conn)
+
+    metrics = build_forecast_adjustments(df_final, df_actual_sales)
+    metrics.columns = ['month', 'customer', 'category', 'amount']
+    metrics['name'] = FORECAST_ADJUSTMENT_METRIC
+    metrics['snapshot_id'] = snapshot_id
+    conn.execute(text("DELETE FROM snapshot_metrics WHERE snapshot_id = :snapshot_id"), params)
+    bulk_insert_frame('snapshot_metrics', metrics, conn)
+    return rows
+
+
+# --- 전처리 결과 캐시 ---
+# 전처리 프레임은 원본 식별자(파일 mtime/size 또는 snapshot id) 기준으로 프로세스 전역에 캐시합니다.
+# 캐시된 프레임은 여러 요청이 공유하므로 호출하는 쪽에서 변경하면 안 됩니다.
+# 같은 키를 동시에 로드하지 않도록 로드 중인 키는 Future로 공유하고,
+# 로드 중에 무효화된 결과는 저장하지 않도록 무효화 범위별 세대 번호를 둡니다.
+# 항목 크기(메모리 사용량) 합계가 PROCESSED_CACHE_MAX_BYTES를 넘으면 가장 오래 안 쓰인 항목부터 제거합니다.
+PROCESSED_CACHE_MAX_BYTES = int(os.environ.get("PROCESSED_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+_processed_cache = OrderedDict()
+_processed_cache_sizes = {}
+_processed_cache_loading = {}
+_processed_cache_generations = {}  # {snapshot_id (None이면 전체): 무효화 횟수}
+_processed_cache_stats = {"hits": 0, "misses": 0, "waits": 0, "evictions": 0, "invalidations": 0, "bytes": 0}
+_processed_cache_lock = threading.Lock()
+
+
+# 캐시 키: ("csv", 파일 식별자, 항목) 또는 ("snapshot", snapshot_id, 항목)
+
+
+def _csv_source_key():
+    """CSV 원본 파일들의 (경로, mtime, size) 조합을 캐시 키로 사용"""
+    key = []
+    for path in (ORDER_CSV_PATH, PRICE_CSV_PATH, ACTUAL_SALES_CSV_PATH):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError as e:
+            raise RuntimeError(f"데이터 파일 로딩 실패: {e}")
+        key.append((path, stat.st_mtime_ns, stat.st_size))
+    return ("csv", tuple(key), "source")
+
+
+def _cached_value_bytes(value):
+    """캐시 항목의 메모리 사용량 (프레임, 역색인 위치 배열, 이들을 담은 dict)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_cached_value_bytes(item) for item in value.values())
+    return 0
+
+
+def _store_cached(key, value, size):
+    """항목 저장 후 크기 제한을 넘으면 오래된 항목 제거 (_processed_cache_lock 안에서 호출)"""
+    if key in _processed_cache:
+        _drop_cached(key)
+    _processed_cache[key] = value
+    _processed_cache_sizes[key] = size
+    _processed_cache_stats["bytes"] += size
+    # 방금 넣은 항목은 제한보다 커도 남김 (매 요청 다시 로드하는 것보다 나음)
+    while _processed_cache_stats["bytes"] > PROCESSED_CACHE_MAX_BYTES and len(_processed_cache) > 1:
+        _drop_cached(next(iter(_processed_cache)))
+        _processed_cache_stats["evictions"] += 1
+
+
+def _drop_cached(key):
+    del _processed_cache[key]
+    _processed_cache_stats["bytes"] -= _processed_cache_sizes.pop(key)
+
+
+def _cache_generation(key):
+    """key를 무효화하는 범위(전체, 해당 스냅샷)의 세대 번호 (_processed_cache_lock 안에서 호출)"""
+    scope = key[1] if key[0] == "snapshot" else None
+    return _processed_cache_generations.get(None, 0), _processed_cache_generations.get(scope, 0)
+
+
+def _get_cached(key, loader):
+    """
+    캐시에 있으면 반환하고, 없으면 loader()로 생성 후 저장
+
+    같은 키를 동시에 요청하면 한 요청만 loader()를 실행하고 나머지는 그 결과를 기다림.
+    로드하는 동안 무효화가 있었으면 결과는 반환만 하고 저장하지 않음
+    """
+    with _processed_cache_lock:
+        if key in _processed_cache:
+            _processed_cache.move_to_end(key)
+            _processed_cache_stats["hits"] += 1
+            return _processed_cache[key]
+        loading = _processed_cache_loading.get(key)
+        if loading is None:
+            _processed_cache_stats["misses"] += 1
+            loading = _processed_cache_loading[key] = Future()
+            generation = _cache_generation(key)
+        else:
+            _processed_cache_stats["waits"] += 1
+            generation = None
+
+    if generation is None:
+        return loading.result()
+
+    try:
+        value = loader()
+    except BaseException as e:
+        with _processed_cache_lock:
+            if _processed_cache_loading.get(key) is loading:
+                del _processed_cache_loading[key]
+        loading.set_exception(e)
+        raise
+
+    size = _cached_value_bytes(value)
+    with _processed_cache_lock:
+        if _processed_cache_loading.get(key) is loading:
+            del _processed_cache_loading[key]
+        if generation == _cache_generation(key):
+            # CSV 파일이 바뀌어 식별자가 달라진 이전 항목은 더 이상 쓰이지 않으므로 정리
+            if key[0] == "csv":
+                for stale in [k for k in _processed_cache if k[0] == "csv" and k[1] != key[1]]:
+                    _drop_cached(stale)
+            _store_cached(key, value, size)
+    loading.set_result(value)
+    return value
+
+
+def invalidate_processed_cache(snapshot_id=None):
+    """스냅샷 업로드/수정 시 캐시 무효화 (snapshot_id가 없으면 전체)"""
+    def is_stale(k):
+        return snapshot_id is None or (k[0] == "snapshot" and k[1] == snapshot_id)
+
+    with _processed_cache_lock:
+        _processed_cache_generations[snapshot_id] = _processed_cache_generations.get(snapshot_id, 0) + 1
+        stale = [k for k in _processed_cache if is_stale(k)]
+        for k in stale:
+            _drop_cached(k)
+        # 무효화 전에 시작된 로드는 기다리지 않고 다음 요청부터 새로 로드
+        for k in [k for k in _processed_cache_loading if is_stale(k)]:
+            del _processed_cache_loading[k]
+        _processed_cache_stats["invalidations"] += len(stale)
+    invalidate_dashboard_cache(snapshot_id)
+
+
+def get_processed_cache_stats():
+    """캐시 hit/miss 통계와 캐시된 전처리 프레임의 행당 메모리"""
+    with _processed_cache_lock:
+        stats = {**_processed_cache_stats, "entries": len(_processed_cache), "max_bytes": PROCESSED_CACHE_MAX_BYTES}
+        cached = list(_processed_cache.items())
+
+    frames = {}
+    for key, value in cached:
+        if key[-1] in ("source", "frame"):
+            frame_stats = frame_memory_stats(value["frame"])
+            frame_stats["index_bytes"] = sum(
+                positions.nbytes for index in value["index"].values() for positions in index.values()
+            )
+            frames["csv" if key[0] == "csv" else f"snapshot:{key[1]}"] = frame_stats
+    stats["frames"] = frames
+
+    with _dashboard_cache_lock:
+        stats["responses"] = {
+            **_dashboard_cache_stats,
+            "entries": len(_dashboard_cache),
+            "bytes": _dashboard_cache_state["bytes"],
+            "max_bytes": DASHBOARD_CACHE_MAX_BYTES,
+        }
+    return stats
+
+
+def get_processed_data():
+    def load():
+        try:
+            df_order = pd.read_csv(ORDER_CSV_PATH, encoding='cp949', low_memory=False)
+            df_price = pd.read_csv(PRICE_CSV_PATH, encoding='cp949', low_memory=False)
+            df_actual_sales = pd.read_csv(ACTUAL_SALES_CSV_PATH, encoding='cp949', low_memory=False)
+        except FileNotFoundError as e:
+            # 실제 운영환경에서는 더 정교한 에러 처리가 필요합니다.
+            raise RuntimeError(f"데이터 파일 로딩 실패: {e}")
+        df_final = sort_by_due_date(compact_frame(build_processed_data(df_order, df_price)))
+        return {
+            "frame": df_final,
+            "index": build_filter_index(df_final),
+            "cube": build_backlog_cube(df_final),
+            "adjustments": build_forecast_adjustments(df_final, df_actual_sales),
+        }
+
+    return _get_cached(_csv_source_key(), load)
+
+
+def get_snapshot_orders(snapshot_id):
+    """스냅샷 테이블로부터 만든 전처리 프레임과 필터 역색인 {"frame", "index"} (CSV 파싱 없이 SQL로만 로드)"""
+    def load():
+        df_order, df_price, _ = load_snapshot_frames(snapshot_id)
+        df_final = sort_by_due_date(compact_frame(build_processed_data(df_order, df_price)))
+        # 역색인의 행 위치가 프레임과 어긋나지 않도록 한 캐시 항목으로 함께 보관
+        return {"frame": df_final, "index": build_filter_index(df_final)}
+
+    return _get_cached(("snapshot", snapshot_id, "frame"), load)
+
+
+def get_snapshot_frame(snapshot_id):
+    """스냅샷의 전처리 프레임"""
+    return get_snapshot_orders(snapshot_id)["frame"]
+
+
+def get_snapshot_cube(snapshot_id):
+    """스냅샷의 backlog_cube (저장된 집계가 없는 예전 스냅샷은 전처리 프레임에서 계산)"""
+    def load():
+        cube = load_backlog_cube(snapshot_id)
+        if cube.empty:
+            cube = build_backlog_cube(get_snapshot_frame(snapshot_id))
+        return cube
+
+    return _get_cached(("snapshot", snapshot_id, "cube"), load)
+
+
+def get_snapshot_adjustments(snapshot_id):
+    """스냅샷의 기준월 예측조정 (저장된 지표가 없는 예전 스냅샷이나 다른 기준월이면 전처리 프레임에서 계산)"""
+    def load():
+        adjustments = load_forecast_adjustments(snapshot_id)
+        if adjustments.empty:
+            df_actual_sales = _read_snapshot_table('actual_sales', SNAPSHOT_ACTUAL_SALES_COLUMNS, snapshot_id, engine)
+            adjustments = build_forecast_adjustments(get_snapshot_frame(snapshot_id), df_actual_sales)
+        return adjustments
+
+    return _get_cached(("snapshot", snapshot_id, "adjustments"), load)
+
+
+# --- 대시보드 응답 캐시 ---
+# 같은 데이터와 필터의 대시보드 응답은 직렬화한 JSON 그대로 보관합니다 (LRU, 전체 크기 제한, TTL).
+# 응답 본문 해시를 ETag로 내려주므로 If-None-Match가 같으면 본문 없이 304를 반환합니다.
+DASHBOARD_CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+DASHBOARD_CACHE_TTL_SECONDS = float(os.environ.get("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+
+_dashboard_cache = OrderedDict()
+_dashboard_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+# generation: 무효화할 때마다 증가 (계산 중에 무효화된 응답은 저장하지 않기 위함)
+_dashboard_cache_state = {"bytes": 0, "generation": 0}
+_dashboard_cache_lock = threading.Lock()
+
+
+def dashboard_cache_key(filters, snapshot_id):
+    """
+    (데이터 식별자, 정규화한 필터)
+
+    고객사/중분류 목록은 순서와 중복을 무시하고, 빈 목록은 필터 없음과 같게 취급
+    """
+    source = ("csv", _csv_source_key()[1]) if snapshot_id is None else ("snapshot", snapshot_id)
+    return (
+        *source,
+        filters.start_date.isoformat(),
+        filters.end_date.isoformat(),
+        tuple(sorted(set(filters.customers or ()))),
+        tuple(sorted(set(filters.categories or ()))),
+    )
+
+
+def _drop_dashboard_response(key):
+    entry = _dashboard_cache.pop(key)
+    _dashboard_cache_state["bytes"] -= entry["size"]
+
+
+def get_dashboard_response(key):
+    """캐시된 응답 {"body", "etag", ...} (없거나 만료됐으면 None)"""
+    with _dashboard_cache_lock:
+        entry = _dashboard_cache.get(key)
+        if entry is not None and entry["expires_at"] <= time.monotonic():
+            _drop_dashboard_response(key)
+            entry = None
+        if entry is None:
+            _dashboard_cache_stats["misses"] += 1
+            return None
+        _dashboard_cache.move_to_end(key)
+        _dashboard_cache_stats["hits"] += 1
+        return entry
+
+
+def put_dashboard_response(key, body, generation):
+    """
+    직렬화한 응답을 캐시에 넣고 항목 반환
+
+    전체 크기가 DASHBOARD_CACHE_MAX_BYTES를 넘으면 가장 오래 안 쓰인 항목부터 제거.
+    계산을 시작한 뒤 무효화가 있었으면(generation이 다르면) 저장하지 않음
+    """
+    entry = {
+        "body": body,
+        "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        "expires_at": time.monotonic() + DASHBOARD_CACHE_TTL_SECONDS,
+        "size": len(body) + len(repr(key)),
+    }
+    if entry["size"] > DASHBOARD_CACHE_MAX_BYTES:
+        return entry
+
+    with _dashboard_cache_lock:
+        if generation != _dashboard_cache_state["generation"]:
+            return entry
+        if key in _dashboard_cache:
+            _drop_dashboard_response(key)
+        _dashboard_cache[key] = entry
+        _dashboard_cache_state["bytes"] += entry["size"]
+        while _dashboard_cache_state["bytes"] > DASHBOARD_CACHE_MAX_BYTES:
+            _drop_dashboard_response(next(iter(_dashboard_cache)))
+            _dashboard_cache_stats["evictions"] += 1
+    return entry
+
+
+def invalidate_dashboard_cache(snapshot_id=None):
+    """스냅샷 업로드/수정 시 응답 캐시 무효화 (snapshot_id가 없으면 전체)"""
+    with _dashboard_cache_lock:
+        _dashboard_cache_state["generation"] += 1
+        if snapshot_id is None:
+            stale = list(_dashboard_cache)
+        else:
+            stale = [k for k in _dashboard_cache if k[0] == "snapshot" and k[1] == snapshot_id]
+        for k in stale:
+            _drop_dashboard_response(k)
+        _dashboard_cache_stats["invalidations"] += len(stale)
+
+
+def _etag_matches(if_none_match, etag):
+    """
+    If-None-Match 헤더(여러 개, W/ 약한 비교)가 etag와 맞는지
+
+    구체적인 태그만 비교. POST에서 *는 304가 아니라 412 대상이고 모든 재계산을 가리므로 지원하지 않음
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+
+def dashboard_response(entry, request):
+    """캐시 항목으로 응답 생성 (If-None-Match가 같으면 본문 없이 304)"""
+    # POST 응답은 브라우저가 자동으로 재검증하지 않으므로 클라이언트가 ETag를 If-None-Match로 보내야 함
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
 
 # --- API 엔드포인트 ---
 @app.get("/")
 def read_root():
     return {"message": "Order Data Analysis API is running."}
 
-@app.post("/api/v1/dashboard", response_model=DashboardData)
-def get_dashboard_data_endpoint(filters: DashboardFilter):
-    df_final = get_processed_data()
-
-    # 필터링
-    filtered_df = df_final[
-        (pd.to_datetime(df_final['납기요청일']).dt.date >= filters.start_date) &
-        (pd.to_datetime(df_final['납기요청일']).dt.date <= filters.end_date) &
-        (df_final['고객사'].isin(filters.customers if filters.customers else df_final['고객사'].unique())) &
-        (df_final['중분류'].isin(filters.categories if filters.categories else df_final['중분류'].unique()))
-    ]
-
+@app.get("/api/v1/dashboard/cache")
+def get_dashboard_cache_stats():
+    """전처리/응답 캐시 hit/miss 통계와 캐시된 프레임의 행당 메모리"""
+    return get_processed_cache_stats()
+
+def _is_month_aligned(start_date, end_date):
+    """기간이 월 단위로 딱 떨어지면 backlog_cube로 응답 가능"""
+    next_day = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    return start_date.day == 1 and next_day.day == 1
+
+
+def _filter_backlog_cube(cube, filters):
+    start_month = f"{filters.start_date:%Y-%m}"
+    end_month = f"{filters.end_date:%Y-%m}"
+    mask = (cube['납기요청월'] >= start_month) & (cube['납기요청월'] <= end_month)
+    if filters.customers:
+        mask &= cube['고객사'].isin(filters.customers)
+    if filters.categories:
+        mask &= cube['중분류'].isin(filters.categories)
+    return cube[mask]
+
+
+def _filter_adjustments(adjustments, filters):
+    """예측조정 행 필터 (기준월 1일 납기로 취급)"""
+    due_date = pd.to_datetime(adjustments['납기요청월']).dt.date
+    mask = (due_date >= filters.start_date) & (due_date <= filters.end_date)
+    if filters.customers:
+        mask &= adjustments['고객사'].isin(filters.customers)
+    if filters.categories:
+        mask &= adjustments['중분류'].isin(filters.categories)
+    return adjustments[mask]
+
+
+def filter_order_frame(df_final, index, filters):
+    """
+    납기요청일 순으로 정렬된 전처리 프레임에서 필터에 맞는 행 선택
+
+    기간은 searchsorted로 찾은 위치 구간을 잘라내고, 고객사/중분류 조건은 지정된 경우에만 적용.
+    조건이 있으면 역색인(build_filter_index)에서 가장 좁은 조건의 행 위치를 모은 뒤
+    나머지 조건은 그 행들만 검사하므로, 비용은 전체 행 수가 아니라 일치하는 행 수에 비례
+    """
+    dates = df_final['납기요청일']
+    start = dates.searchsorted(pd.Timestamp(filters.start_date), side='left')
+    # 종료일 당일의 모든 시각 포함
+    end = dates.searchsorted(pd.Timestamp(filters.end_date) + pd.Timedelta(days=1), side='left')
+
+    conditions = [(col, values) for col, values in zip(FILTER_INDEX_COLUMNS, (filters.customers, filters.categories)) if values]
+    if not conditions:
+        return df_final.iloc[start:end]
+
+    # 값별 위치 배열에서 기간 구간만 잘라냄 (복사 없는 view)
+    matches = {}
+    for col, values in conditions:
+        matches[col] = [
+            positions[positions.searchsorted(start):positions.searchsorted(end)]
+            for positions in (index[col].get(value) for value in set(values)) if positions is not None
+        ]
+    narrowest = min(matches, key=lambda col: sum(len(positions) for positions in matches[col]))
+    rows = np.sort(np.concatenate(matches[narrowest])) if matches[narrowest] else np.empty(0, dtype=np.int64)
+    filtered_df = df_final.iloc[rows]
+
+    for col, values in conditions:
+        if col != narrowest:
+            filtered_df = filtered_df[filtered_df[col].isin(values)]
+    return filtered_df
+
+
+def _sum_backlog(filtered_df, adjustments, key):
+    """key별 보정수주액 합계에 예측조정 합계를 더함 (주문 프레임을 복사하지 않고 집계 결과끼리 합산)"""
+    series = filtered_df.groupby(key, observed=True)['보정수주액'].sum()
+    if key == '납기요청월':
+        # 원본 주문은 Period, cube/예측조정은 'YYYY-MM' 문자열
+        series.index = series.index.astype(str)
+    else:
+        series.index = series.index.astype(object)
+    if adjustments is not None and not adjustments.empty:
+        series = series.add(adjustments.groupby(key)['보정수주액'].sum(), fill_value=0)
+    return series
+
+
+def build_dashboard_data(filtered_df, adjustments=None):
+    """필터링된 프레임(원본 주문 또는 backlog_cube)과 예측조정 행으로 대시보드 응답 생성"""
     # 1. 월별 데이터 계산
-    monthly_backlog_series = filtered_df.groupby('납기요청월')['보정수주액'].sum()
+    monthly_backlog_series = _sum_backlog(filtered_df, adjustments, '납기요청월')
     monthly_result = []
     for month, amount in monthly_backlog_series.items():
-        is_special = str(month) == '2025-12'
+        is_special = str(month) == FORECAST_CUTOFF_MONTH
         monthly_result.append(MonthlyBacklog(month=str(month), amount=round(amount / 1e8, 2), is_special=is_special))
 
     # 2. 고객사 데이터 계산
-    customer_backlog_series = filtered_df.groupby('고객사')['보정수주액'].sum().nlargest(50)
+    customer_backlog_series = _sum_backlog(filtered_df, adjustments, '고객사').nlargest(50)
     customer_result = [CustomerBacklog(customer=customer, amount=round(amount / 1e8, 2)) for customer, amount in customer_backlog_series.items()]
 
     # 3. 중유형 데이터 계산
-    category_backlog_series = filtered_df.groupby('중분류')['보정수주액'].sum()
+    category_backlog_series = _sum_backlog(filtered_df, adjustments, '중분류')
     total_backlog = category_backlog_series.sum()
     category_result = []
     for cat, amount in category_backlog_series.items():
@@ -241,228 +1111,552 @@ def get_dashboard_data_endpoint(filters: DashboardFilter):
     )
 
 
+def compute_dashboard_data(filters, snapshot_id=None):
+    """snapshot_id가 있으면 해당 스냅샷 테이블, 없으면 로컬 CSV 기준으로 계산"""
+    if snapshot_id is not None:
+        db = SessionLocal()
+        try:
+            if not db.query(Snapshot.id).filter(Snapshot.id == snapshot_id).first():
+                raise HTTPException(status_code=404, detail="Snapshot not found")
+        finally:
+            db.close()
+
+    adjustments = get_processed_data()["adjustments"] if snapshot_id is None else get_snapshot_adjustments(snapshot_id)
+    adjustments = _filter_adjustments(adjustments, filters)
+
+    # 월 단위 기간이면 주문 라인 대신 미리 집계된 cube에서 응답
+    if _is_month_aligned(filters.start_date, filters.end_date):
+        cube = get_processed_data()["cube"] if snapshot_id is None else get_snapshot_cube(snapshot_id)
+        return build_dashboard_data(_filter_backlog_cube(cube, filters), adjustments)
+
+    orders = get_processed_data() if snapshot_id is None else get_snapshot_orders(snapshot_id)
+    return build_dashboard_data(filter_order_frame(orders["frame"], orders["index"], filters), adjustments)
+
+
+@app.post("/api/v1/dashboard", response_model=DashboardData)
+def get_dashboard_data_endpoint(filters: DashboardFilter, request: Request, snapshot_id: Optional[int] = None):
+    """대시보드 집계 (같은 데이터/필터의 응답은 캐시에서 반환, ETag/If-None-Match 지원)"""
+    key = dashboard_cache_key(filters, snapshot_id)
+    entry = get_dashboard_response(key)
+    if entry is None:
+        generation = _dashboard_cache_state["generation"]
+        data = compute_dashboard_data(filters, snapshot_id)
+        entry = put_dashboard_response(key, data.model_dump_json().encode(), generation)
+    return dashboard_response(entry, request)
+
+
+# --- CSV 적재 ---
+# 컬럼 매핑/숫자 정리 규칙은 api/_lib/tables.py의 TABLE_SPECS 한 곳에서 관리
+# 파일별 파싱/정리는 스레드 풀에서 병렬로 하고, DB 기록은 한 스레드가 _db_write_lock을 잡고 순차 수행합니다.
+# 파싱된 청크는 크기 제한이 있는 큐로 넘기므로 기록이 밀려도 메모리 사용량은 일정합니다.
+INGEST_PARSE_WORKERS = int(os.environ.get("INGEST_PARSE_WORKERS", "6"))
+INGEST_QUEUE_CHUNKS = int(os.environ.get("INGEST_QUEUE_CHUNKS", "4"))
+
+_db_write_lock = threading.Lock()
+
+
+@contextmanager
+def parallel_table_chunks(files):
+    """
+    {테이블: 파일 객체}를 병렬로 파싱해 (테이블, 청크)를 준비되는 순서대로 넘겨주는 반복자
+
+    테이블별 마지막에는 (테이블, None)이 옴. 파싱 오류는 반복 중에 그대로 발생
+    """
+    chunks = queue.Queue(maxsize=INGEST_QUEUE_CHUNKS)
+    stop = threading.Event()
+
+    def put(item):
+        # 소비 쪽이 중단되면 대기 중인 파서도 빠져나오도록 짧게 끊어서 기다림
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def parse(table, fileobj):
+        try:
+            for df in iter_table_chunks(table, fileobj):
+                if not put((table, df)):
+                    return
+            put((table, None))
+        except Exception as e:
+            put((table, e))
+
+    def drain():
+        pending = set(files)
+        while pending:
+            table, item = chunks.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                pending.discard(table)
+            yield table, item
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(len(files), INGEST_PARSE_WORKERS)), thread_name_prefix="ingest-parse"
+    )
+    for table, fileobj in files.items():
+        executor.submit(parse, table, fileobj)
+    try:
+        yield drain()
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+# 주문 라인 식별 컬럼 (수량/단가가 바뀌어도 같은 라인). 식별 값이 모두 같은 라인은 파일 안 순번으로 구분
+ORDER_LINE_KEY_COLUMNS = ['creation_date', 'customer_code', 'sales_team', 'material_code', 'category_name', 'delivery_date']
+
+
+def order_line_keys(df, counts):
+    """
+    주문 라인 키 (식별 컬럼 해시 + 같은 식별 값 중 몇 번째인지의 해시) 계산
+
+    counts는 앞 청크까지의 식별 값별 개수로, 청크를 넘어 순번이 이어지도록 갱신됨
+    """
+    # 파일에 없는 식별 컬럼은 NULL로 해시 (TABLE_SPECS는 있는 컬럼만 적재함)
+    identity = pd.util.hash_pandas_object(df.reindex(columns=ORDER_LINE_KEY_COLUMNS), index=False)
+    occurrence = identity.groupby(identity).cumcount() + identity.map(counts).fillna(0).astype('int64')
+    for value, n in identity.value_counts().items():
+        counts[value] = counts.get(value, 0) + n
+    keys = pd.util.hash_pandas_object(pd.DataFrame({'identity': identity, 'occurrence': occurrence}), index=False)
+    # SQLite INTEGER는 부호 있는 64비트
+    return keys.to_numpy().view('int64')
+
+
+def write_table_chunks(chunks, snapshot_id, conn, progress=None):
+    """
+    parallel_table_chunks의 청크를 받는 대로 DB에 기록하고 테이블별 적재 통계 반환
+
+    progress(table, stats)는 청크마다 호출됨 (업로드 작업 진행률 보고용).
+    seconds는 그 테이블 청크를 기록한 시간의 합 (다른 테이블 기록/파싱 대기 시간 제외)
+    """
+    rows = {}
+    seconds = {}
+    table_stats = {}
+    line_key_counts = {}
+    for table, df in chunks:
+        if df is None:
+            table_stats[table] = ingest_stats(rows.get(table, 0), seconds.get(table, 0), done=True)
+            if progress:
+                progress(table, table_stats[table])
+            continue
+        started = time.perf_counter()
+        df['snapshot_id'] = snapshot_id
+        if table == 'order_data':
+            df['line_key'] = order_line_keys(df, line_key_counts)
+        rows[table] = rows.get(table, 0) + bulk_insert_frame(table, df, conn)
+        seconds[table] = seconds.get(table, 0) + time.perf_counter() - started
+        if progress:
+            progress(table, ingest_stats(rows[table], seconds[table], done=False))
+    return {table: table_stats[table] for table in TABLE_SPECS if table in table_stats}
+
+
+# --- 업로드 파일 내용 공유 ---
+# 업로드 파일은 SHA-256으로 식별합니다. 이미 저장된 내용과 같은 파일은 파싱/삽입하지 않고
+# snapshot_tables에 기존 행이 있는 스냅샷(data_snapshot_id)만 기록해 행을 공유합니다.
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def hash_upload_file(fileobj):
+    """파일 내용 SHA-256 (다 읽은 뒤 처음 위치로 되돌림)"""
+    digest = hashlib.sha256()
+    for block in iter(lambda: fileobj.read(HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def find_shared_tables(hashes, conn):
+    """{테이블: 해시} 중 같은 내용이 이미 저장된 테이블의 {테이블: (data_snapshot_id, base_snapshot_id, 행 수)}"""
+    shared = {}
+    for table, content_hash in hashes.items():
+        row = conn.execute(text(
+            "SELECT data_snapshot_id, base_snapshot_id, rows FROM snapshot_tables "
+            "WHERE table_name = :table AND content_hash = :content_hash LIMIT 1"
+        ), {"table": table, "content_hash": content_hash}).first()
+        if row is not None:
+            shared[table] = tuple(row)
+    return shared
+
+
+def release_table_rows(table, snapshot_id, conn):
+    """
+    snapshot_id 자리의 table 행을 비움 (테이블을 새 내용으로 바꾸기 전에 호출)
+
+    이 자리를 기준으로 하는 델타는 먼저 전체 스냅샷으로 합치고,
+    다른 스냅샷이 이 행을 공유하고 있으면 지우지 않고 그중 가장 앞 스냅샷 자리로 옮김.
+    행 위치가 바뀐 스냅샷 id 집합을 반환 (커밋 후 캐시 무효화용)
+    """
+    params = {"table": table, "snapshot_id": snapshot_id}
+    dependents = conn.execute(text(
+        "SELECT DISTINCT data_snapshot_id FROM snapshot_tables "
+        "WHERE table_name = :table AND base_snapshot_id = :snapshot_id"
+    ), params).scalars().all()
+    moved = set()
+    for data_id in dependents:
+        moved |= compact_order_delta(data_id, snapshot_id, conn)
+
+    sharers = conn.execute(text(
+        "SELECT snapshot_id FROM snapshot_tables "
+        "WHERE table_name = :table AND data_snapshot_id = :snapshot_id AND snapshot_id != :snapshot_id"
+    ), params).scalars().all()
+    if not sharers:
+        conn.execute(text(f"DELETE FROM {table} WHERE snapshot_id = :snapshot_id"), params)
+        return moved
+
+    heir = min(sharers)
+
+    params["heir"] = heir
+    conn.execute(text(f"UPDATE {table} SET snapshot_id = :heir WHERE snapshot_id = :snapshot_id"), params)
+    conn.execute(text(
+        "UPDATE snapshot_tables SET data_snapshot_id = :heir "
+        "WHERE table_name = :table AND data_snapshot_id = :snapshot_id AND snapshot_id != :snapshot_id"
+    ), params)
+    return moved | set(sharers)
+
+
+def record_snapshot_table(snapshot_id, table, content_hash, source_id, base_id, rows, conn):
+    """snapshot_tables에 스냅샷 테이블의 파일 해시와 행 위치 기록 (이미 있으면 교체)"""
+    params = {
+        "snapshot_id": snapshot_id,
+        "table": table,
+        "content_hash": content_hash,
+        "data_snapshot_id": source_id,
+        "base_snapshot_id": base_id,
+        "rows": rows,
+    }
+    conn.execute(text("DELETE FROM snapshot_tables WHERE snapshot_id = :snapshot_id AND table_name = :table"), params)
+    conn.execute(text(
+        "INSERT INTO snapshot_tables (snapshot_id, table_name, content_hash, data_snapshot_id, base_snapshot_id, rows) "
+        "VALUES (:snapshot_id, :table, :content_hash, :data_snapshot_id, :base_snapshot_id, :rows)"
+    ), params)
+
+
+# --- order_data 델타 스냅샷 ---
+# 새 order_data는 먼저 전체를 기록한 뒤 기준 스냅샷과 line_key로 비교해 새 라인/바뀐 라인/삭제 표시만 남깁니다.
+# 기준 스냅샷은 항상 전체 스냅샷이라 읽을 때는 기준 + 델타 하나만 합치면 됩니다.
+# 델타가 기준 행 수의 ORDER_DELTA_MAX_RATIO를 넘으면 델타로 줄이지 않고 새 기준(전체)으로 둡니다 (압축).
+ORDER_DELTA_MAX_RATIO = float(os.environ.get("ORDER_DELTA_MAX_RATIO", "0.3"))
+
+ORDER_VALUE_COLUMNS = [column.target for column in TABLE_SPECS['order_data'].columns]
+
+
+def order_delta_base(snapshot_id, conn):
+    """snapshot_id 직전 스냅샷의 order_data 기준(전체) 스냅샷 id (직전 스냅샷이 없으면 None)"""
+    previous = conn.execute(
+        text("SELECT MAX(id) FROM snapshots WHERE id < :snapshot_id"), {"snapshot_id": snapshot_id}
+    ).scalar()
+    if previous is None:
+        return None
+    data_id, base_id = resolve_snapshot_table('order_data', previous, conn)
+    return base_id if base_id is not None else data_id
+
+
+def convert_to_order_delta(snapshot_id, conn):
+    """
+    snapshot_id 자리에 기록한 전체 order_data를 기준 스냅샷에 대한 델타로 줄임
+
+    Returns:
+        (기준 스냅샷 id, 저장된 행 수). 전체로 둘 때 기준 스냅샷 id는 None
+    """
+    params = {"snapshot_id": snapshot_id, "base_snapshot_id": order_delta_base(snapshot_id, conn)}
+    total = conn.execute(
+        text("SELECT COUNT(*) FROM order_data WHERE snapshot_id = :snapshot_id"), params
+    ).scalar()
+    if params["base_snapshot_id"] in (None, snapshot_id):
+        return None, total
+
+    # line_key가 없는 (이전 버전에서 저장한) 기준과는 비교할 수 없음
+    base_total, base_unkeyed = conn.execute(text(
+        "SELECT COUNT(*), COUNT(*) - COUNT(line_key) FROM order_data WHERE snapshot_id = :base_snapshot_id"
+    ), params).first()
+    if base_total == 0 or base_unkeyed:
+        return None, total
+
+    unchanged = (
+        "SELECT n.id FROM order_data n JOIN order_data b "
+        "ON b.snapshot_id = :base_snapshot_id AND b.line_key = n.line_key "
+        "WHERE n.snapshot_id = :snapshot_id AND "
+        + " AND ".join(f"n.{column} IS b.{column}" for column in ORDER_VALUE_COLUMNS)
+    )
+    removed = (
+        "FROM order_data b WHERE b.snapshot_id = :base_snapshot_id AND b.line_key NOT IN "
+        "(SELECT line_key FROM order_data WHERE snapshot_id = :snapshot_id)"
+    )
+    n_unchanged = conn.execute(text(f"SELECT COUNT(*) FROM ({unchanged})"), params).scalar()
+    n_removed = conn.execute(text(f"SELECT COUNT(*) {removed}"), params).scalar()
+    stored = total - n_unchanged + n_removed
+    if stored > ORDER_DELTA_MAX_RATIO * base_total:
+        return None, total
+
+    # 삭제 표시를 먼저 넣어야 함 (변경 없는 라인부터 지우면 삭제된 라인처럼 보임)
+    conn.execute(text(
+        f"INSERT INTO order_data (snapshot_id, line_key, is_deleted) SELECT :snapshot_id, b.line_key, 1 {removed}"
+    ), params)
+    conn.execute(text(f"DELETE FROM order_data WHERE id IN ({unchanged})"), params)
+    return params["base_snapshot_id"], stored
+
+
+def compact_order_delta(data_id, base_id, conn):
+    """
+    델타 자리(data_id)에 기준 스냅샷 행을 합쳐 전체로 만듦 (이 델타를 가리키는 스냅샷 모두 적용)
+
+    행이 다시 쓰인 스냅샷 id 집합을 반환 (커밋 후 캐시 무효화용)
+    """
+    params = {"snapshot_id": data_id, "base_snapshot_id": base_id}
+    columns = ", ".join([*ORDER_VALUE_COLUMNS, 'line_key'])
+    conn.execute(text(
+        f"INSERT INTO order_data (snapshot_id, {columns}) "
+        f"SELECT :snapshot_id, {columns} FROM order_data "
+        "WHERE snapshot_id = :base_snapshot_id AND line_key NOT IN "
+        "(SELECT line_key FROM order_data WHERE snapshot_id = :snapshot_id)"
+    ), params)
+    conn.execute(text("DELETE FROM order_data WHERE snapshot_id = :snapshot_id AND is_deleted = 1"), params)
+    conn.execute(text(
+        "UPDATE snapshot_tables SET base_snapshot_id = NULL "
+        "WHERE table_name = 'order_data' AND data_snapshot_id = :snapshot_id"
+    ), params)
+    readers = conn.execute(text(
+        "SELECT snapshot_id FROM snapshot_tables "
+        "WHERE table_name = 'order_data' AND data_snapshot_id = :snapshot_id"
+    ), params).scalars().all()
+    return {data_id, *readers}
+
+
+def store_snapshot_files(snapshot_id, fileobjs, hashes, reuse, chunks, conn, progress=None):
+    """
+    업로드 파일을 스냅샷 테이블로 저장하고 snapshot_tables 기록 (_db_write_lock 안에서 호출)
+
+    reuse는 잠금 전에 찾은 공유 대상(find_shared_tables 결과), chunks는 나머지 파일의 파싱 결과.
+    새로 기록한 order_data는 가능하면 직전 스냅샷 기준의 델타로 줄임.
+    (테이블별 통계, 공유 행 이관/압축으로 행 위치가 바뀐 다른 스냅샷 id 집합)을 반환
+    """
+    # 파싱하는 동안 다른 요청이 공유 대상을 바꿨을 수 있으므로 잠금 안에서 다시 확인
+    shared = find_shared_tables({table: hashes[table] for table in reuse}, conn)
+    missed = {table: fileobjs[table] for table in reuse if table not in shared}
+
+    table_stats, moved = {}, set()
+    for table, (source_id, base_id, rows) in shared.items():
+        # 이미 같은 내용을 가리키고 있으면 그대로 둠
+        if (source_id, base_id) != resolve_snapshot_table(table, snapshot_id, conn):
+            moved |= release_table_rows(table, snapshot_id, conn)
+        table_stats[table] = ingest_stats(rows, 0, done=True, shared_from=source_id)
+        if progress:
+            progress(table, table_stats[table])
+
+    for table in fileobjs:
+        if table not in shared:
+            moved |= release_table_rows(table, snapshot_id, conn)
+    table_stats.update(write_table_chunks(chunks, snapshot_id, conn, progress))
+    if missed:
+        with parallel_table_chunks(missed) as missed_chunks:
+            table_stats.update(write_table_chunks(missed_chunks, snapshot_id, conn, progress))
+
+    # 위의 release_table_rows가 공유 대상 델타를 전체로 압축했을 수 있으므로 기준은 지금 상태로 다시 확인
+    bases = {table: resolve_snapshot_table(table, source_id, conn)[1] for table, (source_id, _, _) in shared.items()}
+    if 'order_data' in table_stats and 'order_data' not in shared:
+        bases['order_data'], stored = convert_to_order_delta(snapshot_id, conn)
+        table_stats['order_data'].update(base_snapshot_id=bases['order_data'], stored_rows=stored)
+
+    for table, stats in table_stats.items():
+        source_id = shared[table][0] if table in shared else snapshot_id
+        record_snapshot_table(snapshot_id, table, hashes[table], source_id, bases.get(table), stats["rows"], conn)
+    stats = {table: table_stats[table] for table in TABLE_SPECS if table in table_stats}
+    return stats, moved - {snapshot_id}
+
+
+def summarize_table_stats(table_stats):
+    """새로 저장한 행 수와 다른 스냅샷과 공유한 행 수"""
+    saved = sum(stats["rows"] for stats in table_stats.values() if "shared_from" not in stats)
+    shared = sum(stats["rows"] for stats in table_stats.values() if "shared_from" in stats)
+    return saved, shared
+
+
+def ingest_snapshot_upload(files, description, progress=None):
+    """
+    테이블별 CSV 파일 경로를 받아 새 스냅샷으로 저장
+
+    스냅샷 행, 6개 테이블, 집계를 한 트랜잭션으로 기록하므로 중간에 실패하면 아무것도 남지 않음.
+    이전 업로드와 내용이 같은 파일은 파싱/삽입하지 않고 기존 행을 공유
+    """
+    with ExitStack() as stack:
+        fileobjs = {table: stack.enter_context(open(path, 'rb')) for table, path in files.items()}
+        hashes = {table: hash_upload_file(fileobj) for table, fileobj in fileobjs.items()}
+        with engine.connect() as conn:
+            reuse = find_shared_tables(hashes, conn)
+
+        # 파싱은 쓰기 잠금을 기다리는 동안에도 먼저 시작
+        parse_files = {table: fileobj for table, fileobj in fileobjs.items() if table not in reuse}
+        with parallel_table_chunks(parse_files) as chunks, _db_write_lock:
+            db = SessionLocal()
+            try:
+                # snapshots 테이블에 기록 (flush로 id만 받고 커밋은 마지막에)
+                new_snapshot = Snapshot(
+                    created_at=datetime.now().isoformat(),
+                    description=str(description)
+                )
+                db.add(new_snapshot)
+                db.flush()
+                snapshot_id = new_snapshot.id
+
+                table_stats, moved = store_snapshot_files(
+                    snapshot_id, fileobjs, hashes, reuse, chunks, db.connection(), progress
+                )
+                rebuild_snapshot_aggregates(snapshot_id, db.connection())
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    # 공유 행을 넘겨받거나 압축된 다른 스냅샷의 캐시도 무효화
+    for moved_id in {snapshot_id, *moved}:
+        invalidate_processed_cache(moved_id)
+
+    rows_saved, rows_shared = summarize_table_stats(table_stats)
+    return {
+        "message": "Snapshot created successfully",
+        "snapshot_id": snapshot_id,
+        "rows_saved": rows_saved,
+        "rows_shared": rows_shared,
+        "tables": table_stats
+    }
+
+
+# --- 업로드 작업 큐 ---
+# 업로드는 임시 파일로 옮긴 뒤 작업자 스레드에서 처리하고, 진행 상황은 프로세스 메모리에 보관합니다.
+# SQLite는 쓰기가 한 번에 하나뿐이므로 작업자 수 기본값은 1입니다.
+UPLOAD_JOB_WORKERS = int(os.environ.get("UPLOAD_JOB_WORKERS", "1"))
+UPLOAD_JOB_HISTORY = int(os.environ.get("UPLOAD_JOB_HISTORY", "200"))
+
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_JOB_WORKERS, thread_name_prefix="upload-job")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def create_job(kind):
+    """새 작업을 queued 상태로 등록 (오래된 완료 작업은 UPLOAD_JOB_HISTORY개만 유지)"""
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        finished = [jid for jid, job in _jobs.items() if job["status"] in ("succeeded", "failed")]
+        for jid in finished[:max(0, len(finished) - UPLOAD_JOB_HISTORY + 1)]:
+            del _jobs[jid]
+        _jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "tables": {},
+            "result": None,
+            "error": None,
+        }
+    return job_id
+
+
+def update_job(job_id, **fields):
+    with _jobs_lock:
+        _jobs[job_id].update(fields)
+
+
+def get_job(job_id):
+    """작업 상태 사본 반환 (없으면 None)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "tables": dict(job["tables"])}
+
+
+def stage_upload_files(form):
+    """업로드 파일을 요청이 끝나도 남는 임시 파일로 복사 ({테이블: 경로})"""
+    files = {}
+    try:
+        for table, spec in TABLE_SPECS.items():
+            upload_file = form.get(spec.form_field)
+            if upload_file and hasattr(upload_file, 'read'):
+                with tempfile.NamedTemporaryFile(prefix=f"upload_{table}_", suffix=".csv", delete=False) as staged:
+                    shutil.copyfileobj(upload_file.file, staged)
+                files[table] = staged.name
+    except Exception:
+        remove_staged_files(files)
+        raise
+    return files
+
+
+def remove_staged_files(files):
+    for path in files.values():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def run_upload_job(job_id, files, description):
+    """작업자 스레드에서 업로드를 처리하고 테이블별 진행률을 작업에 기록"""
+    def progress(table, stats):
+        with _jobs_lock:
+            _jobs[job_id]["tables"][table] = stats
+
+    update_job(job_id, status="running", started_at=datetime.now().isoformat())
+    try:
+        result = ingest_snapshot_upload(files, description, progress)
+        update_job(job_id, status="succeeded", result=result, finished_at=datetime.now().isoformat())
+        return result
+    except Exception as e:
+        update_job(job_id, status="failed", error=str(e), finished_at=datetime.now().isoformat())
+        raise
+    finally:
+        remove_staged_files(files)
+
+
 # --- 스냅샷 저장 엔드포인트 ---
-@app.post("/upload")
-async def upload_csv(request: Request):
-    """6개 CSV 파일을 받아 데이터베이스에 스냅샷으로 저장"""
+@app.post("/upload", status_code=202)
+async def upload_csv(request: Request, wait: bool = False):
+    """
+    6개 CSV 파일을 받아 데이터베이스에 스냅샷으로 저장
+
+    기본은 작업 id를 바로 반환하고 백그라운드에서 처리 (진행 상황: GET /jobs/{job_id}).
+    wait=true이면 처리가 끝날 때까지 기다려 결과를 반환
+    """
     try:
-        # multipart form 파싱
+        # multipart form 파싱 후 파일을 작업용 임시 파일로 옮김
         form = await request.form()
         description = form.get("description", "")
+        files = await asyncio.to_thread(stage_upload_files, form)
 
-        # 파일들 가져오기
-        order_file = form.get("order_file")
-        price_file = form.get("price_file")
-        plan_customer_file = form.get("plan_customer_file")
-        expect_customer_file = form.get("expect_customer_file")
-        plan_category_file = form.get("plan_category_file")
-        actual_sales_file = form.get("actual_sales_file")
+        job_id = create_job("upload")
+        future = _upload_executor.submit(run_upload_job, job_id, files, description)
 
-        # 스냅샷 생성
-        db = SessionLocal()
-        try:
-            # snapshots 테이블에 기록
-            new_snapshot = Snapshot(
-                created_at=datetime.now().isoformat(),
-                description=str(description)
-            )
-            db.add(new_snapshot)
-            db.commit()
-            db.refresh(new_snapshot)
-            snapshot_id = new_snapshot.id
-
-            total_rows = 0
-
-            # 1. Order Data 처리
-            if order_file and hasattr(order_file, 'read'):
-                contents = await order_file.read()
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-                df.columns = df.columns.str.strip()
-                column_mapping = {
-                    '생성일': 'creation_date',
-                    '고객약호': 'customer_code',
-                    '영업팀명': 'sales_team',
-                    '자재': 'material_code',
-                    '중분류명': 'category_name',
-                    '미납잔량': 'backlog_qty',
-                    '단가': 'unit_price',
-                    '변경납기일': 'delivery_date'
-                }
-                df = df.rename(columns=column_mapping)
-                target_columns = ['creation_date', 'customer_code', 'sales_team',
-                                  'material_code', 'category_name', 'backlog_qty',
-                                  'unit_price', 'delivery_date']
-                existing_columns = [col for col in target_columns if col in df.columns]
-                df = df[existing_columns]
-
-                for col in ['backlog_qty', 'unit_price']:
-                    if col in df.columns:
-                        df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-                df['snapshot_id'] = snapshot_id
-                df.to_sql('order_data', engine, if_exists='append', index=False)
-                total_rows += len(df)
-
-            # 2. Price Table 처리
-            if price_file and hasattr(price_file, 'read'):
-                contents = await price_file.read()
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-                df.columns = df.columns.str.strip()
-                column_mapping = {
-                    '관리유형코드(중)': 'category_code',
-                    '중분류': 'category_code',
-                    '평균단가': 'average_price'
-                }
-                df = df.rename(columns=column_mapping)
-                target_columns = ['category_code', 'average_price']
-                existing_columns = [col for col in target_columns if col in df.columns]
-                df = df[existing_columns]
-
-                if 'average_price' in df.columns:
-                    df['average_price'] = df['average_price'].astype(str).str.replace(',', '').str.strip()
-                    df['average_price'] = pd.to_numeric(df['average_price'], errors='coerce').fillna(0)
-
-                df['snapshot_id'] = snapshot_id
-                df.to_sql('price_table', engine, if_exists='append', index=False)
-                total_rows += len(df)
-
-            # 3. Plan Customer 처리
-            if plan_customer_file and hasattr(plan_customer_file, 'read'):
-                contents = await plan_customer_file.read()
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-                df.columns = df.columns.str.strip()
-                column_mapping = {
-                    '고객사': 'customer',
-                    '2025년': 'year_total',
-                    '1월': 'month_01', '2월': 'month_02', '3월': 'month_03',
-                    '4월': 'month_04', '5월': 'month_05', '6월': 'month_06',
-                    '7월': 'month_07', '8월': 'month_08', '9월': 'month_09',
-                    '10월': 'month_10', '11월': 'month_11', '12월': 'month_12'
-                }
-                df = df.rename(columns=column_mapping)
-
-                numeric_cols = ['year_total'] + [f'month_{i:02d}' for i in range(1, 13)]
-                for col in numeric_cols:
-                    if col in df.columns:
-                        df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-                df['snapshot_id'] = snapshot_id
-                df.to_sql('plan_customer', engine, if_exists='append', index=False)
-                total_rows += len(df)
-
-            # 4. Expect Customer 처리
-            if expect_customer_file and hasattr(expect_customer_file, 'read'):
-                contents = await expect_customer_file.read()
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-                df.columns = df.columns.str.strip()
-                column_mapping = {
-                    '고객사': 'customer',
-                    '2025년': 'year_total',
-                    '1월': 'month_01', '2월': 'month_02', '3월': 'month_03',
-                    '4월': 'month_04', '5월': 'month_05', '6월': 'month_06',
-                    '7월': 'month_07', '8월': 'month_08', '9월': 'month_09',
-                    '10월': 'month_10', '11월': 'month_11', '12월': 'month_12'
-                }
-                df = df.rename(columns=column_mapping)
-
-                numeric_cols = ['year_total'] + [f'month_{i:02d}' for i in range(1, 13)]
-                for col in numeric_cols:
-                    if col in df.columns:
-                        df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-                df['snapshot_id'] = snapshot_id
-                df.to_sql('expect_customer', engine, if_exists='append', index=False)
-                total_rows += len(df)
-
-            # 5. Plan Category 처리
-            if plan_category_file and hasattr(plan_category_file, 'read'):
-                contents = await plan_category_file.read()
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-                df.columns = df.columns.str.strip()
-                column_mapping = {
-                    '중분류': 'category',
-                    '중분류명': 'category',
-                    '2025년': 'year_total',
-                    '1월': 'month_01', '2월': 'month_02', '3월': 'month_03',
-                    '4월': 'month_04', '5월': 'month_05', '6월': 'month_06',
-                    '7월': 'month_07', '8월': 'month_08', '9월': 'month_09',
-                    '10월': 'month_10', '11월': 'month_11', '12월': 'month_12'
-                }
-                df = df.rename(columns=column_mapping)
-
-                numeric_cols = ['year_total'] + [f'month_{i:02d}' for i in range(1, 13)]
-                for col in numeric_cols:
-                    if col in df.columns:
-                        df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-                df['snapshot_id'] = snapshot_id
-                df.to_sql('plan_category', engine, if_exists='append', index=False)
-                total_rows += len(df)
-
-            # 6. Actual Sales 처리
-            if actual_sales_file and hasattr(actual_sales_file, 'read'):
-                contents = await actual_sales_file.read()
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-                df.columns = df.columns.str.strip()
-                column_mapping = {
-                    '고객약호': 'customer_code',
-                    '중분류명': 'category_name',
-                    '매출': 'sales_amount',
-                    '대금청구일': 'invoice_date'
-                }
-                df = df.rename(columns=column_mapping)
-                target_columns = ['customer_code', 'category_name', 'sales_amount', 'invoice_date']
-                existing_columns = [col for col in target_columns if col in df.columns]
-                df = df[existing_columns]
-
-                if 'sales_amount' in df.columns:
-                    df['sales_amount'] = df['sales_amount'].astype(str).str.replace(',', '').str.strip()
-                    df['sales_amount'] = pd.to_numeric(df['sales_amount'], errors='coerce').fillna(0)
-
-                df['snapshot_id'] = snapshot_id
-                df.to_sql('actual_sales', engine, if_exists='append', index=False)
-                total_rows += len(df)
-
-            return {
-                "message": "Snapshot created successfully",
-                "snapshot_id": snapshot_id,
-                "rows_saved": total_rows
-            }
-        finally:
-            db.close()
+        if wait:
+            result = await asyncio.wrap_future(future)
+            return JSONResponse(status_code=200, content=result)
+
+        return {
+            "message": "Upload accepted",
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}"
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# --- 업로드 작업 상태 조회 ---
+@app.get("/jobs/{job_id}")
+def get_upload_job(job_id: str):
+    """업로드 작업 상태와 테이블별 적재 행 수/초당 행 수 조회"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 # --- 스냅샷 목록 조회 ---
 @app.get("/snapshots")
 def get_snapshots():
@@ -482,24 +1676,56 @@ def get_snapshots():
         db.close()
 
 
+def read_snapshot_table_records(table, snapshot_id):
+    """스냅샷 테이블 전체를 화면용 한글 컬럼명 레코드로 조회"""
+    columns = [column.name for column in Base.metadata.tables[table].columns]
+    query, params = snapshot_table_query(table, snapshot_id, columns, ordered=False)
+    df = pd.read_sql(text(query), engine, params=params)
+    if not df.empty:
+        df = df.rename(columns=TABLE_SPECS[table].display_names)
+        df = df.drop(columns=['id', 'snapshot_id', 'line_key', 'is_deleted'], errors='ignore')
+    return dataframe_to_records(df)
+
+
+# 스트리밍 응답에서 DB 커서로 한 번에 가져오는 행 수
+STREAM_FETCH_ROWS = 1000
+
+
+def iter_snapshot_table_rows(table, snapshot_id, columns, cursor=None, limit=None):
+    """스냅샷 테이블 행을 DB 커서에서 배치 단위로 꺼내 화면용 컬럼명 dict로 하나씩 반환"""
+    display_names = TABLE_SPECS[table].display_names
+    query, params = snapshot_table_query(table, snapshot_id, columns, cursor if cursor is not None else 0, limit)
+    # 정렬용으로 붙은 id는 요청한 컬럼이 아니면 빼고 반환
+    skip_id = 'id' not in columns
+
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=STREAM_FETCH_ROWS).execute(text(query), params)
+        keys = [display_names.get(key, key) for key in result.keys()]
+        for row in result:
+            record = dict(zip(keys, row))
+            if skip_id:
+                del record['id']
+            yield record
+
+
+def stream_snapshot_response(snapshot):
+    """스냅샷 전체를 일반 응답과 같은 JSON 형태로 스트리밍 (행 목록을 메모리에 만들지 않음)"""
+    data = {"snapshot": snapshot}
+    for table, spec in TABLE_SPECS.items():
+        data[table] = iter_snapshot_table_rows(table, snapshot["id"], [c.target for c in spec.columns])
+    return StreamingResponse(iter_json_chunks(data), media_type="application/json")
+
+
 # --- 최신 스냅샷 데이터 조회 ---
 @app.get("/snapshots/latest")
-def get_latest_snapshot():
-    """최신 스냅샷의 모든 데이터 조회"""
+def get_latest_snapshot(stream: bool = False):
+    """최신 스냅샷의 모든 데이터 조회 (stream=true: DB에서 읽는 대로 스트리밍)"""
     db = SessionLocal()
     try:
         # 최신 스냅샷 조회
         latest = db.query(Snapshot).order_by(Snapshot.id.desc()).first()
         if not latest:
-            return {
-                "snapshot": None,
-                "order_data": [],
-                "price_table": [],
-                "plan_customer": [],
-                "expect_customer": [],
-                "plan_category": [],
-                "actual_sales": []
-            }
+            return {"snapshot": None, **{table: [] for table in TABLE_SPECS}}
 
         result = {
             "snapshot": {
@@ -508,98 +1734,11 @@ def get_latest_snapshot():
                 "description": latest.description
             }
         }
+        if stream:
+            return stream_snapshot_response(result["snapshot"])
 
-        # 1. Order Data 조회
-        query = f"SELECT * FROM order_data WHERE snapshot_id = {latest.id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'creation_date': '생성일',
-                'customer_code': '고객약호',
-                'sales_team': '영업팀명',
-                'material_code': '자재',
-                'category_name': '중분류명',
-                'backlog_qty': '미납잔량',
-                'unit_price': '단가',
-                'delivery_date': '변경납기일'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["order_data"] = df.to_dict(orient='records')
-
-        # 2. Price Table 조회
-        query = f"SELECT * FROM price_table WHERE snapshot_id = {latest.id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'category_code': '중분류',
-                'average_price': '평균단가'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["price_table"] = df.to_dict(orient='records')
-
-        # 3. Plan Customer 조회
-        query = f"SELECT * FROM plan_customer WHERE snapshot_id = {latest.id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'customer': '고객사',
-                'year_total': '2025년',
-                'month_01': '1월', 'month_02': '2월', 'month_03': '3월',
-                'month_04': '4월', 'month_05': '5월', 'month_06': '6월',
-                'month_07': '7월', 'month_08': '8월', 'month_09': '9월',
-                'month_10': '10월', 'month_11': '11월', 'month_12': '12월'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["plan_customer"] = df.to_dict(orient='records')
-
-        # 4. Expect Customer 조회
-        query = f"SELECT * FROM expect_customer WHERE snapshot_id = {latest.id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'customer': '고객사',
-                'year_total': '2025년',
-                'month_01': '1월', 'month_02': '2월', 'month_03': '3월',
-                'month_04': '4월', 'month_05': '5월', 'month_06': '6월',
-                'month_07': '7월', 'month_08': '8월', 'month_09': '9월',
-                'month_10': '10월', 'month_11': '11월', 'month_12': '12월'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["expect_customer"] = df.to_dict(orient='records')
-
-        # 5. Plan Category 조회
-        query = f"SELECT * FROM plan_category WHERE snapshot_id = {latest.id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'category': '중분류',
-                'year_total': '2025년',
-                'month_01': '1월', 'month_02': '2월', 'month_03': '3월',
-                'month_04': '4월', 'month_05': '5월', 'month_06': '6월',
-                'month_07': '7월', 'month_08': '8월', 'month_09': '9월',
-                'month_10': '10월', 'month_11': '11월', 'month_12': '12월'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["plan_category"] = df.to_dict(orient='records')
-
-        # 6. Actual Sales 조회
-        query = f"SELECT * FROM actual_sales WHERE snapshot_id = {latest.id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'customer_code': '고객약호',
-                'category_name': '중분류명',
-                'sales_amount': '매출',
-                'invoice_date': '대금청구일'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["actual_sales"] = df.to_dict(orient='records')
+        for table in TABLE_SPECS:
+            result[table] = read_snapshot_table_records(table, latest.id)
 
         return result
     finally:
@@ -608,8 +1747,8 @@ def get_latest_snapshot():
 
 # --- 특정 스냅샷 데이터 조회 ---
 @app.get("/snapshots/{snapshot_id}")
-def get_snapshot(snapshot_id: int):
-    """특정 스냅샷의 모든 데이터 조회"""
+def get_snapshot(snapshot_id: int, stream: bool = False):
+    """특정 스냅샷의 모든 데이터 조회 (stream=true: DB에서 읽는 대로 스트리밍)"""
     db = SessionLocal()
     try:
         snapshot = db.query(Snapshot).filter(Snapshot.id == snapshot_id).first()
@@ -623,354 +1762,284 @@ def get_snapshot(snapshot_id: int):
                 "description": snapshot.description
             }
         }
+        if stream:
+            return stream_snapshot_response(result["snapshot"])
 
-        # 1. Order Data 조회
-        query = f"SELECT * FROM order_data WHERE snapshot_id = {snapshot_id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'creation_date': '생성일',
-                'customer_code': '고객약호',
-                'sales_team': '영업팀명',
-                'material_code': '자재',
-                'category_name': '중분류명',
-                'backlog_qty': '미납잔량',
-                'unit_price': '단가',
-                'delivery_date': '변경납기일'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["order_data"] = df.to_dict(orient='records')
-
-        # 2. Price Table 조회
-        query = f"SELECT * FROM price_table WHERE snapshot_id = {snapshot_id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'category_code': '중분류',
-                'average_price': '평균단가'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["price_table"] = df.to_dict(orient='records')
-
-        # 3. Plan Customer 조회
-        query = f"SELECT * FROM plan_customer WHERE snapshot_id = {snapshot_id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'customer': '고객사',
-                'year_total': '2025년',
-                'month_01': '1월', 'month_02': '2월', 'month_03': '3월',
-                'month_04': '4월', 'month_05': '5월', 'month_06': '6월',
-                'month_07': '7월', 'month_08': '8월', 'month_09': '9월',
-                'month_10': '10월', 'month_11': '11월', 'month_12': '12월'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["plan_customer"] = df.to_dict(orient='records')
-
-        # 4. Expect Customer 조회
-        query = f"SELECT * FROM expect_customer WHERE snapshot_id = {snapshot_id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'customer': '고객사',
-                'year_total': '2025년',
-                'month_01': '1월', 'month_02': '2월', 'month_03': '3월',
-                'month_04': '4월', 'month_05': '5월', 'month_06': '6월',
-                'month_07': '7월', 'month_08': '8월', 'month_09': '9월',
-                'month_10': '10월', 'month_11': '11월', 'month_12': '12월'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["expect_customer"] = df.to_dict(orient='records')
-
-        # 5. Plan Category 조회
-        query = f"SELECT * FROM plan_category WHERE snapshot_id = {snapshot_id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'category': '중분류',
-                'year_total': '2025년',
-                'month_01': '1월', 'month_02': '2월', 'month_03': '3월',
-                'month_04': '4월', 'month_05': '5월', 'month_06': '6월',
-                'month_07': '7월', 'month_08': '8월', 'month_09': '9월',
-                'month_10': '10월', 'month_11': '11월', 'month_12': '12월'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["plan_category"] = df.to_dict(orient='records')
-
-        # 6. Actual Sales 조회
-        query = f"SELECT * FROM actual_sales WHERE snapshot_id = {snapshot_id}"
-        df = pd.read_sql(query, engine)
-        if not df.empty:
-            column_mapping = {
-                'customer_code': '고객약호',
-                'category_name': '중분류명',
-                'sales_amount': '매출',
-                'invoice_date': '대금청구일'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.drop(columns=['id', 'snapshot_id'], errors='ignore')
-        result["actual_sales"] = df.to_dict(orient='records')
+        for table in TABLE_SPECS:
+            result[table] = read_snapshot_table_records(table, snapshot_id)
 
         return result
     finally:
         db.close()
 
 
-# --- 스냅샷 업데이트 엔드포인트 ---
-@app.patch("/snapshots/{snapshot_id}")
-async def update_snapshot(snapshot_id: int, request: Request):
-    """기존 스냅샷의 특정 테이블만 업데이트 (부분 업데이트)"""
+def read_snapshot_table_page(table, snapshot_id, columns, cursor, limit):
+    """스냅샷 테이블을 id 기준 keyset 페이지로 조회 (요청한 컬럼만 SELECT)"""
+    # columns는 resolve_columns로 검증된 컬럼명만 들어옴. 한 행을 더 읽어 다음 페이지 존재 여부 판단
+    query, params = snapshot_table_query(table, snapshot_id, columns, cursor if cursor is not None else 0, limit + 1)
+    df = pd.read_sql(text(query), engine, params=params)
+    next_cursor = int(df['id'].iloc[limit - 1]) if len(df) > limit else None
+    df = df.iloc[:limit].rename(columns=TABLE_SPECS[table].display_names)
+    return dataframe_to_records(df), next_cursor
+
+
+# --- 스냅샷 테이블 페이지 조회 ---
+@app.get("/snapshots/{snapshot_id}/{table}")
+def get_snapshot_table(
+    snapshot_id: int,
+    table: str,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    columns: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """
+    특정 스냅샷 테이블을 페이지 단위로 조회 (cursor: 이전 페이지의 next_cursor, columns: 쉼표 구분)
+
+    format=ndjson이면 cursor 이후 행을 한 줄에 하나씩 스트리밍 (limit 생략 시 전체)
+    """
+    if table not in TABLE_SPECS:
+        raise HTTPException(status_code=404, detail="Table not found")
+    try:
+        selected = resolve_columns(table, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     db = SessionLocal()
     try:
-        # 1. 스냅샷 존재 확인
-        snapshot = db.query(Snapshot).filter(Snapshot.id == snapshot_id).first()
-        if not snapshot:
+        if not db.query(Snapshot.id).filter(Snapshot.id == snapshot_id).first():
             raise HTTPException(status_code=404, detail="Snapshot not found")
+    finally:
+        db.close()
 
-        # 2. multipart form 파싱
-        form = await request.form()
+    if format == "ndjson":
+        rows = iter_snapshot_table_rows(table, snapshot_id, ['id', *selected], cursor, limit)
+        return StreamingResponse(iter_ndjson(rows), media_type="application/x-ndjson")
 
-        # 파일들 가져오기
-        order_file = form.get("order_file")
-        price_file = form.get("price_file")
-        plan_customer_file = form.get("plan_customer_file")
-        expect_customer_file = form.get("expect_customer_file")
-        plan_category_file = form.get("plan_category_file")
-        actual_sales_file = form.get("actual_sales_file")
+    rows, next_cursor = read_snapshot_table_page(table, snapshot_id, selected, cursor, limit or DEFAULT_PAGE_SIZE)
+    display_names = TABLE_SPECS[table].display_names
+    return {
+        "snapshot_id": snapshot_id,
+        "table": table,
+        "columns": ["id", *(display_names[c] for c in selected)],
+        "rows": rows,
+        "next_cursor": next_cursor
+    }
 
-        updated_tables = []
-        total_rows = 0
 
-        # 3. 각 파일 처리 (트랜잭션)
+# Arrow/Parquet 내보내기: 한 번에 읽어 record batch로 쓰는 행 수
+EXPORT_CHUNK_ROWS = 50000
 
-        # 3-1. Order Data 처리
-        if order_file and hasattr(order_file, 'read'):
-            # 기존 데이터 삭제
-            db.query(OrderData).filter(OrderData.snapshot_id == snapshot_id).delete()
+EXPORT_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
 
-            # 파일 파싱 및 삽입
-            contents = await order_file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-            df.columns = df.columns.str.strip()
-            column_mapping = {
-                '생성일': 'creation_date',
-                '고객약호': 'customer_code',
-                '영업팀명': 'sales_team',
-                '자재': 'material_code',
-                '중분류명': 'category_name',
-                '미납잔량': 'backlog_qty',
-                '단가': 'unit_price',
-                '변경납기일': 'delivery_date'
-            }
-            df = df.rename(columns=column_mapping)
-            target_columns = ['creation_date', 'customer_code', 'sales_team',
-                              'material_code', 'category_name', 'backlog_qty',
-                              'unit_price', 'delivery_date']
-            existing_columns = [col for col in target_columns if col in df.columns]
-            df = df[existing_columns]
-
-            for col in ['backlog_qty', 'unit_price']:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-            df['snapshot_id'] = snapshot_id
-            df.to_sql('order_data', engine, if_exists='append', index=False)
-            updated_tables.append('order_data')
-            total_rows += len(df)
-
-        # 3-2. Price Table 처리
-        if price_file and hasattr(price_file, 'read'):
-            # 기존 데이터 삭제
-            db.query(PriceTable).filter(PriceTable.snapshot_id == snapshot_id).delete()
-
-            # 파일 파싱 및 삽입
-            contents = await price_file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-            df.columns = df.columns.str.strip()
-            column_mapping = {
-                '관리유형코드(중)': 'category_code',
-                '중분류': 'category_code',
-                '평균단가': 'average_price'
-            }
-            df = df.rename(columns=column_mapping)
-            target_columns = ['category_code', 'average_price']
-            existing_columns = [col for col in target_columns if col in df.columns]
-            df = df[existing_columns]
-
-            if 'average_price' in df.columns:
-                df['average_price'] = df['average_price'].astype(str).str.replace(',', '').str.strip()
-                df['average_price'] = pd.to_numeric(df['average_price'], errors='coerce').fillna(0)
-
-            df['snapshot_id'] = snapshot_id
-            df.to_sql('price_table', engine, if_exists='append', index=False)
-            updated_tables.append('price_table')
-            total_rows += len(df)
-
-        # 3-3. Plan Customer 처리
-        if plan_customer_file and hasattr(plan_customer_file, 'read'):
-            # 기존 데이터 삭제
-            db.query(PlanCustomer).filter(PlanCustomer.snapshot_id == snapshot_id).delete()
-
-            # 파일 파싱 및 삽입
-            contents = await plan_customer_file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-            df.columns = df.columns.str.strip()
-            column_mapping = {
-                '고객사': 'customer',
-                '2025년': 'year_total',
-                '1월': 'month_01', '2월': 'month_02', '3월': 'month_03',
-                '4월': 'month_04', '5월': 'month_05', '6월': 'month_06',
-                '7월': 'month_07', '8월': 'month_08', '9월': 'month_09',
-                '10월': 'month_10', '11월': 'month_11', '12월': 'month_12'
-            }
-            df = df.rename(columns=column_mapping)
-
-            numeric_cols = ['year_total'] + [f'month_{i:02d}' for i in range(1, 13)]
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-            df['snapshot_id'] = snapshot_id
-            df.to_sql('plan_customer', engine, if_exists='append', index=False)
-            updated_tables.append('plan_customer')
-            total_rows += len(df)
-
-        # 3-4. Expect Customer 처리
-        if expect_customer_file and hasattr(expect_customer_file, 'read'):
-            # 기존 데이터 삭제
-            db.query(ExpectCustomer).filter(ExpectCustomer.snapshot_id == snapshot_id).delete()
-
-            # 파일 파싱 및 삽입
-            contents = await expect_customer_file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-            df.columns = df.columns.str.strip()
-            column_mapping = {
-                '고객사': 'customer',
-                '2025년': 'year_total',
-                '1월': 'month_01', '2월': 'month_02', '3월': 'month_03',
-                '4월': 'month_04', '5월': 'month_05', '6월': 'month_06',
-                '7월': 'month_07', '8월': 'month_08', '9월': 'month_09',
-                '10월': 'month_10', '11월': 'month_11', '12월': 'month_12'
-            }
-            df = df.rename(columns=column_mapping)
-
-            numeric_cols = ['year_total'] + [f'month_{i:02d}' for i in range(1, 13)]
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-            df['snapshot_id'] = snapshot_id
-            df.to_sql('expect_customer', engine, if_exists='append', index=False)
-            updated_tables.append('expect_customer')
-            total_rows += len(df)
-
-        # 3-5. Plan Category 처리
-        if plan_category_file and hasattr(plan_category_file, 'read'):
-            # 기존 데이터 삭제
-            db.query(PlanCategory).filter(PlanCategory.snapshot_id == snapshot_id).delete()
-
-            # 파일 파싱 및 삽입
-            contents = await plan_category_file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-            df.columns = df.columns.str.strip()
-            column_mapping = {
-                '중분류': 'category',
-                '중분류명': 'category',
-                '2025년': 'year_total',
-                '1월': 'month_01', '2월': 'month_02', '3월': 'month_03',
-                '4월': 'month_04', '5월': 'month_05', '6월': 'month_06',
-                '7월': 'month_07', '8월': 'month_08', '9월': 'month_09',
-                '10월': 'month_10', '11월': 'month_11', '12월': 'month_12'
-            }
-            df = df.rename(columns=column_mapping)
-
-            numeric_cols = ['year_total'] + [f'month_{i:02d}' for i in range(1, 13)]
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-            df['snapshot_id'] = snapshot_id
-            df.to_sql('plan_category', engine, if_exists='append', index=False)
-            updated_tables.append('plan_category')
-            total_rows += len(df)
-
-        # 3-6. Actual Sales 처리
-        if actual_sales_file and hasattr(actual_sales_file, 'read'):
-            # 기존 데이터 삭제
-            db.query(ActualSales).filter(ActualSales.snapshot_id == snapshot_id).delete()
-
-            # 파일 파싱 및 삽입
-            contents = await actual_sales_file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(contents), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(contents), encoding='cp949')
-
-            df.columns = df.columns.str.strip()
-            column_mapping = {
-                '고객약호': 'customer_code',
-                '중분류명': 'category_name',
-                '매출': 'sales_amount',
-                '대금청구일': 'invoice_date'
-            }
-            df = df.rename(columns=column_mapping)
-            target_columns = ['customer_code', 'category_name', 'sales_amount', 'invoice_date']
-            existing_columns = [col for col in target_columns if col in df.columns]
-            df = df[existing_columns]
 
-            if 'sales_amount' in df.columns:
-                df['sales_amount'] = df['sales_amount'].astype(str).str.replace(',', '').str.strip()
-                df['sales_amount'] = pd.to_numeric(df['sales_amount'], errors='coerce').fillna(0)
+def _import_pyarrow():
+    """pyarrow는 내보내기에만 필요하므로 선택 설치 (없으면 501)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="Arrow/Parquet export requires pyarrow (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def snapshot_numeric_dtypes(table, columns):
+    """숫자 컬럼의 pandas dtype (모델 컬럼 타입 기준: Integer는 NULL을 허용하는 Int64, Float는 float64)"""
+    model_columns = Base.metadata.tables[table].columns
+    return {
+        col: 'Int64' if isinstance(model_columns[col].type, Integer) else 'float64'
+        for col in columns if col in TABLE_SPECS[table].numeric_columns
+    }
+
+
+def iter_snapshot_table_frames(table, snapshot_id, columns):
+    """스냅샷 테이블을 id 순서로 청크 단위 DataFrame으로 조회 (숫자 컬럼은 모델 컬럼 타입 유지)"""
+    spec = TABLE_SPECS[table]
+    query, params = snapshot_table_query(table, snapshot_id, columns)
+    query = text(query)
+    dtype = snapshot_numeric_dtypes(table, columns)
+    with engine.connect() as conn:
+        for df in pd.read_sql(query, conn, params=params, dtype=dtype, chunksize=EXPORT_CHUNK_ROWS):
+            yield df.rename(columns=spec.display_names)
+
+
+def snapshot_table_arrow_schema(pa, table, columns):
+    """청크마다 타입 추론이 달라지지 않도록 테이블 스펙에서 Arrow 스키마 생성"""
+    spec = TABLE_SPECS[table]
+    numeric_dtypes = snapshot_numeric_dtypes(table, columns)
+    arrow_types = {'Int64': pa.int64(), 'float64': pa.float64()}
+    fields = [pa.field('id', pa.int64(), nullable=False)]
+    for col in columns:
+        arrow_type = arrow_types[numeric_dtypes[col]] if col in numeric_dtypes else pa.string()
+        fields.append(pa.field(spec.display_names[col], arrow_type))
+    return pa.schema(fields)
+
+
+def iter_arrow_stream(pa, schema, frames):
+    """DataFrame 청크를 Arrow IPC stream으로 인코딩 (청크마다 record batch 하나씩 전송)"""
+    sink = io.BytesIO()
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for df in frames:
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            yield drain()
+    yield drain()
+
+
+# --- 스냅샷 테이블 내보내기 (Arrow IPC / Parquet) ---
+@app.get("/snapshots/{snapshot_id}/{table}/export")
+def export_snapshot_table(
+    snapshot_id: int,
+    table: str,
+    format: Literal["arrow", "parquet"] = "arrow",
+    columns: Optional[str] = None
+):
+    """스냅샷 테이블을 컬럼형 바이너리로 내보내기 (BI 도구/대시보드용, JSON 대비 전송량과 파싱 비용 감소)"""
+    if table not in TABLE_SPECS:
+        raise HTTPException(status_code=404, detail="Table not found")
+    try:
+        selected = resolve_columns(table, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pa = _import_pyarrow()
 
-            df['snapshot_id'] = snapshot_id
-            df.to_sql('actual_sales', engine, if_exists='append', index=False)
-            updated_tables.append('actual_sales')
-            total_rows += len(df)
+    db = SessionLocal()
+    try:
+        if not db.query(Snapshot.id).filter(Snapshot.id == snapshot_id).first():
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+    finally:
+        db.close()
 
-        # 4. 커밋
-        db.commit()
+    schema = snapshot_table_arrow_schema(pa, table, selected)
+    frames = iter_snapshot_table_frames(table, snapshot_id, selected)
+    filename = f"snapshot_{snapshot_id}_{table}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "arrow":
+        return StreamingResponse(
+            iter_arrow_stream(pa, schema, frames),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers=headers
+        )
+
+    # Parquet은 footer를 마지막에 쓰므로 완성 후 전송 (청크마다 row group 하나)
+    sink = pa.BufferOutputStream()
+    with pa.parquet.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for df in frames:
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+    return Response(
+        content=sink.getvalue().to_pybytes(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers
+    )
 
-        return {
-            "message": "Snapshot updated successfully",
-            "snapshot_id": snapshot_id,
-            "updated_tables": updated_tables,
-            "rows_updated": total_rows
-        }
+
+# --- 스냅샷 업데이트 엔드포인트 ---
+def update_snapshot_tables(snapshot_id, files):
+    """
+    기존 스냅샷의 주어진 테이블({테이블: 파일 객체})만 교체
+
+    삭제, 삽입, 집계 재계산을 한 트랜잭션으로 수행 (파싱은 병렬, 기록은 쓰기 잠금 안에서 순차).
+    이미 저장된 내용과 같은 파일은 파싱하지 않고 기존 행을 공유
+    """
+    hashes = {table: hash_upload_file(fileobj) for table, fileobj in files.items()}
+    with engine.connect() as conn:
+        reuse = find_shared_tables(hashes, conn)
+
+    parse_files = {table: fileobj for table, fileobj in files.items() if table not in reuse}
+    with parallel_table_chunks(parse_files) as chunks, _db_write_lock:
+        db = SessionLocal()
+        try:
+            # 1. 스냅샷 존재 확인
+            snapshot = db.query(Snapshot).filter(Snapshot.id == snapshot_id).first()
+            if not snapshot:
+                raise HTTPException(status_code=404, detail="Snapshot not found")
+
+            # 2. 기존 데이터를 비우고(다른 스냅샷이 공유 중이면 그쪽으로 이관) 새 내용 기록
+            table_stats, moved = store_snapshot_files(snapshot_id, files, hashes, reuse, chunks, db.connection())
+
+            # 3. 집계 재계산 후 커밋
+            if table_stats:
+                rebuild_snapshot_aggregates(snapshot_id, db.connection())
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # 공유 행을 넘겨받거나 압축된 다른 스냅샷의 캐시도 무효화
+    for moved_id in {snapshot_id, *moved}:
+        invalidate_processed_cache(moved_id)
+
+    rows_updated, rows_shared = summarize_table_stats(table_stats)
+    return {
+        "message": "Snapshot updated successfully",
+        "snapshot_id": snapshot_id,
+        "updated_tables": list(table_stats),
+        "rows_updated": rows_updated,
+        "rows_shared": rows_shared,
+        "tables": table_stats
+    }
+
+
+@app.patch("/snapshots/{snapshot_id}")
+async def update_snapshot(snapshot_id: int, request: Request):
+    """기존 스냅샷의 특정 테이블만 업데이트 (부분 업데이트)"""
+    try:
+        # multipart form 파싱 후 적재는 이벤트 루프 밖(스레드)에서 수행
+        form = await request.form()
+        files = {}
+        for table, spec in TABLE_SPECS.items():
+            upload_file = form.get(spec.form_field)
+            if upload_file and hasattr(upload_file, 'read'):
+                files[table] = upload_file.file
+        return await asyncio.to_thread(update_snapshot_tables, snapshot_id, files)
 
     except HTTPException:
-        db.rollback()
         raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
\ No newline at end of file
+
+
+# --- order_data 델타 압축 ---
+@app.post("/snapshots/{snapshot_id}/compact")
+def compact_snapshot(snapshot_id: int):
+    """델타로 저장된 스냅샷의 order_data를 기준 스냅샷과 합쳐 전체로 저장 (읽기 시 병합 비용 제거)"""
+    with _db_write_lock:
+        db = SessionLocal()
+        try:
+            if not db.query(Snapshot.id).filter(Snapshot.id == snapshot_id).first():
+                raise HTTPException(status_code=404, detail="Snapshot not found")
+
+            conn = db.connection()
+            data_id, base_id = resolve_snapshot_table('order_data', snapshot_id, conn)
+            moved = compact_order_delta(data_id, base_id, conn) if base_id is not None else set()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # 같은 델타를 가리키는 스냅샷 모두 행이 다시 쓰였으므로 캐시 무효화
+    for moved_id in moved:
+        invalidate_processed_cache(moved_id)
+
+    return {
+        "snapshot_id": snapshot_id,
+        "compacted": base_id is not None,
+        "base_snapshot_id": base_id
+    }
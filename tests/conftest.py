@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+# main.py는 현재 디렉터리의 data.db를 쓰므로 import 전에 임시 디렉터리로 이동
+os.chdir(tempfile.mkdtemp(prefix="order-data-tests-"))
+
+
+@pytest.fixture
+def order_csv():
+    """TABLE_SPECS 원본 컬럼명으로 된 주문 CSV를 쓰는 함수 (영업팀명 없음, overrides로 컬럼 교체)"""
+    def write(path, n=10, **overrides):
+        order = pd.DataFrame({
+            '생성일': ['2025-01-01'] * n,
+            '고객약호': [f"CU{i % 3}" for i in range(n)],
+            '자재': [f"900{i}" for i in range(n)],
+            '중분류명': ['C1'] * n,
+            '미납잔량': [f"{1000 * (i + 1):,}" for i in range(n)],
+            '단가': [100.0] * n,
+            '변경납기일': ['2025-06-30'] * n,
+        })
+        for column, values in overrides.items():
+            order[column] = values
+        order.to_csv(path, index=False)
+        return str(path)
+
+    return write
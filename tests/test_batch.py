@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from _lib.batch import insert_batched
+
+
+class FakeClient:
+    """Records insert batches and the peak number of concurrent inserts."""
+
+    def __init__(self, delay=0.02, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        self.name = name
+        return self
+
+    def insert(self, batch, returning=None):
+        return FakeInsert(self, batch)
+
+
+class FakeInsert:
+    def __init__(self, client, batch):
+        self.client = client
+        self.batch = batch
+
+    def execute(self):
+        client = self.client
+        with client.lock:
+            index = len(client.batches)
+            client.batches.append(self.batch)
+            client.in_flight += 1
+            client.max_in_flight = max(client.max_in_flight, client.in_flight)
+        try:
+            time.sleep(client.delay)
+            if index == client.fail_on:
+                raise RuntimeError("insert failed")
+        finally:
+            with client.lock:
+                client.in_flight -= 1
+
+
+def make_rows(n):
+    return ({"id": i} for i in range(n))
+
+
+def test_rows_are_split_into_batches():
+    client = FakeClient(delay=0)
+    stats = insert_batched(client, "order_data", make_rows(2500), batch_size=1000, max_concurrency=2)
+
+    assert client.name == "order_data"
+    assert sorted(len(batch) for batch in client.batches) == [500, 1000, 1000]
+    assert sorted(row["id"] for batch in client.batches for row in batch) == list(range(2500))
+    assert stats["rows"] == 2500 and stats["batches"] == 3
+
+
+def test_in_flight_batches_stay_within_concurrency():
+    client = FakeClient()
+    stats = insert_batched(client, "order_data", make_rows(200), batch_size=10, max_concurrency=3)
+
+    assert stats["batches"] == 20
+    assert client.max_in_flight == 3
+
+
+def test_failed_batch_raises_and_stops_remaining_batches():
+    client = FakeClient(fail_on=0)
+    consumed = []
+
+    def rows():
+        for i in range(1000):
+            consumed.append(i)
+            yield {"id": i}
+
+    with pytest.raises(RuntimeError, match="insert failed"):
+        insert_batched(client, "order_data", rows(), batch_size=10, max_concurrency=2)
+
+    # The failure surfaces at the next wait for a free slot, so only the batches
+    # already read before then are sent and the rest of the rows are never read.
+    assert len(client.batches) <= 3
+    assert len(consumed) <= 40
@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_dashboard_etag_revalidation(tmp_path, order_csv):
+    result = main.ingest_snapshot_upload(
+        {'order_data': order_csv(tmp_path / 'dashboard.csv', 단가=[400.0] * 10)}, 'dashboard'
+    )
+    client = TestClient(main.app)
+    url = f"/api/v1/dashboard?snapshot_id={result['snapshot_id']}"
+    body = {'start_date': '2025-06-01', 'end_date': '2025-06-30'}
+
+    response = client.post(url, json=body)
+    assert response.status_code == 200
+    etag = response.headers['etag']
+
+    not_modified = client.post(url, json=body, headers={'If-None-Match': f'"other", W/{etag}'})
+    assert not_modified.status_code == 304 and not_modified.content == b''
+
+    # *는 구체적인 태그가 아니므로 항상 본문을 다시 보냄
+    wildcard = client.post(url, json=body, headers={'If-None-Match': '*'})
+    assert wildcard.status_code == 200 and wildcard.json() == response.json()
@@ -0,0 +1,21 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_arrow_export_keeps_integer_columns(tmp_path, order_csv):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+
+    result = main.ingest_snapshot_upload(
+        {'order_data': order_csv(tmp_path / 'export.csv', 단가=[300.5] * 10)}, 'export'
+    )
+    client = TestClient(main.app)
+    response = client.get(f"/snapshots/{result['snapshot_id']}/order_data/export?format=arrow")
+    assert response.status_code == 200
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.field('미납잔량').type == pa.int64()
+    assert table.schema.field('단가').type == pa.float64()
+    assert table.column('미납잔량').to_pylist() == [1000 * (i + 1) for i in range(10)]
@@ -0,0 +1,65 @@
+import time
+
+import pandas as pd
+
+import main
+
+
+def test_order_file_without_identity_column(tmp_path, order_csv):
+    first = main.ingest_snapshot_upload({'order_data': order_csv(tmp_path / 'first.csv')}, 'no sales team')
+    assert first['tables']['order_data']['rows'] == 10
+
+    with main.engine.connect() as conn:
+        keys = conn.execute(main.text(
+            "SELECT line_key FROM order_data WHERE snapshot_id = :snapshot_id"
+        ), {"snapshot_id": first['snapshot_id']}).scalars().all()
+    assert None not in keys and len(set(keys)) == 10
+
+    # 빠진 컬럼이 매번 같은 값(NULL)으로 해시되어야 다음 업로드가 델타로 저장됨
+    quantities = [f"{1000 * (i + 1):,}" for i in range(10)]
+    quantities[0] = '5'
+    second = main.ingest_snapshot_upload(
+        {'order_data': order_csv(tmp_path / 'second.csv', 미납잔량=quantities)}, 'one line changed'
+    )
+    assert second['tables']['order_data']['base_snapshot_id'] == first['snapshot_id']
+    assert second['tables']['order_data']['stored_rows'] == 1
+
+
+def read_orders(snapshot_id):
+    df = main._read_snapshot_table('order_data', main.SNAPSHOT_ORDER_COLUMNS, snapshot_id, main.engine)
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def test_patch_with_file_of_own_delta(tmp_path, order_csv):
+    base = main.ingest_snapshot_upload({'order_data': order_csv(tmp_path / 'base.csv', 단가=[200.0] * 10)}, 'base')
+    quantities = [f"{1000 * (i + 1):,}" for i in range(10)]
+    quantities[3] = '7'
+    delta_path = order_csv(tmp_path / 'delta.csv', 단가=[200.0] * 10, 미납잔량=quantities)
+    delta = main.ingest_snapshot_upload({'order_data': delta_path}, 'delta')
+    assert delta['tables']['order_data']['base_snapshot_id'] == base['snapshot_id']
+    expected = read_orders(delta['snapshot_id'])
+
+    # 기준 스냅샷을 자기 델타와 같은 파일로 교체하면 델타가 전체로 압축되고 기준을 공유
+    with open(delta_path, 'rb') as fileobj:
+        main.update_snapshot_tables(base['snapshot_id'], {'order_data': fileobj})
+
+    with main.engine.connect() as conn:
+        assert main.resolve_snapshot_table('order_data', base['snapshot_id'], conn) == (delta['snapshot_id'], None)
+        assert main.resolve_snapshot_table('order_data', delta['snapshot_id'], conn) == (delta['snapshot_id'], None)
+    pd.testing.assert_frame_equal(read_orders(base['snapshot_id']), expected)
+    pd.testing.assert_frame_equal(read_orders(delta['snapshot_id']), expected)
+
+
+def test_table_seconds_count_only_its_own_chunks():
+    def chunks():
+        # 다른 테이블을 기록하거나 파싱을 기다리는 시간
+        time.sleep(0.3)
+        yield 'price_table', pd.DataFrame({'category_code': ['C1', 'C2'], 'average_price': [1.0, 2.0]})
+        time.sleep(0.3)
+        yield 'price_table', None
+
+    with main.engine.connect() as conn:
+        stats = main.write_table_chunks(chunks(), -1, conn)
+        conn.rollback()
+    assert stats['price_table']['rows'] == 2
+    assert stats['price_table']['seconds'] < 0.3
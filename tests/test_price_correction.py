@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+
+def correct_prices_rowwise(df_order, df_price):
+    """이전 버전의 행 단위 단가 보정 (correct_prices 비교 기준)"""
+    price_dict = df_price.set_index('중분류')['평균단가'].to_dict()
+
+    def correct_price(row):
+        if row['단가'] == 0:
+            if row['총본품수량'] == 0: return 200
+            else: return price_dict.get(row['중분류'], 0)
+        else: return row['단가']
+    return df_order.apply(correct_price, axis=1)
+
+
+def generate_frames(seed, n=5000):
+    rng = np.random.default_rng(seed)
+    categories = [f"C{i}" for i in range(20)]
+    df_order = pd.DataFrame({
+        '단가': rng.choice([0.0, 0.0, 100000.0, 2500000.5, np.nan], n),
+        '총본품수량': rng.choice([0.0, 1.0, 5.0, np.nan], n),
+        '중분류': rng.choice(categories + ['ZZ'], n),
+    })
+    df_order.loc[rng.choice(n, n // 20, replace=False), '중분류'] = np.nan
+
+    # 단가표에 없는 중분류(C15~), 같은 중분류가 여러 번 나오는 행, 빈 평균단가 포함
+    price_categories = categories[:15] + list(rng.choice(categories[:15], 5))
+    df_price = pd.DataFrame({
+        '중분류': price_categories,
+        '평균단가': rng.integers(100000, 10000000, len(price_categories)).astype(float),
+    })
+    df_price.loc[rng.choice(len(df_price), 2, replace=False), '평균단가'] = np.nan
+    return df_order, df_price
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_correct_prices_matches_rowwise(seed):
+    df_order, df_price = generate_frames(seed)
+    assert df_price['중분류'].duplicated().any() and df_price['평균단가'].isna().any()
+
+    expected = correct_prices_rowwise(df_order, df_price).astype(float)
+    pd.testing.assert_series_equal(main.correct_prices(df_order, df_price), expected, check_names=False)
+
+
+def test_build_processed_data_prices_match_rowwise():
+    df_order, df_price = generate_frames(7)
+    df_order['자재'] = '9001'
+    df_order['수량'] = 3
+    df_order['납기요청일'] = '2025-06-30'
+    df_price['평균단가'] = df_price['평균단가'].map(lambda x: f"{x:,.0f}" if pd.notna(x) else x)
+
+    processed = main.build_processed_data(df_order, df_price)
+    cleaned = main.clean_numeric_columns(df_price.copy(), ['평균단가'])
+    expected = correct_prices_rowwise(df_order, cleaned).astype(float)
+    pd.testing.assert_series_equal(processed['보정단가'], expected, check_names=False)
+    pd.testing.assert_series_equal(processed['보정수주액'], expected * 3, check_names=False)
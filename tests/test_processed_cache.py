@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+
+def test_invalidation_during_load_is_not_stored():
+    key = ("snapshot", -1, "frame")
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return "before patch"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        loading = executor.submit(main._get_cached, key, slow_load)
+        assert started.wait(5)
+        main.invalidate_processed_cache(-1)
+        release.set()
+        # 로드를 시작한 요청은 결과를 받지만 캐시에는 남지 않음
+        assert loading.result() == "before patch"
+
+    assert main._get_cached(key, lambda: "after patch") == "after patch"
+    main.invalidate_processed_cache(-1)
+
+
+def test_concurrent_misses_load_once():
+    key = ("snapshot", -2, "frame")
+    calls = []
+    release = threading.Event()
+    waits = main._processed_cache_stats["waits"]
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return "frame"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = [executor.submit(main._get_cached, key, load) for _ in range(8)]
+        while main._processed_cache_stats["waits"] < waits + 7 and not all(f.done() for f in results):
+            threading.Event().wait(0.01)
+        release.set()
+        assert [f.result() for f in results] == ["frame"] * 8
+    assert len(calls) == 1
+    main.invalidate_processed_cache(-2)
+
+
+def test_failed_load_is_not_cached():
+    key = ("snapshot", -3, "frame")
+
+    def fail():
+        raise RuntimeError("load failed")
+
+    with pytest.raises(RuntimeError):
+        main._get_cached(key, fail)
+    assert main._get_cached(key, lambda: "frame") == "frame"
+    main.invalidate_processed_cache(-3)
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    frame = pd.DataFrame({'보정수주액': np.zeros(1000)})
+    size = main._cached_value_bytes(frame)
+    monkeypatch.setattr(main, "PROCESSED_CACHE_MAX_BYTES", main._processed_cache_stats["bytes"] + 2 * size)
+    keys = [("snapshot", -10 - i, "cube") for i in range(3)]
+
+    main._get_cached(keys[0], frame.copy)
+    main._get_cached(keys[1], frame.copy)
+    main._get_cached(keys[0], frame.copy)  # keys[1]이 가장 오래 안 쓰인 항목이 됨
+    main._get_cached(keys[2], frame.copy)
+
+    assert keys[0] in main._processed_cache and keys[2] in main._processed_cache
+    assert keys[1] not in main._processed_cache
+    for key in keys:
+        main.invalidate_processed_cache(key[1])
+    assert sum(main._processed_cache_sizes.values()) == main._processed_cache_stats["bytes"]
+
+
+def is_cached(snapshot_id):
+    return ("snapshot", snapshot_id, "frame") in main._processed_cache
+
+
+def test_heir_move_invalidates_sharing_snapshot(tmp_path, order_csv):
+    path = order_csv(tmp_path / 'shared.csv', 단가=[700.0] * 10)
+    first = main.ingest_snapshot_upload({'order_data': path}, 'first')['snapshot_id']
+    second = main.ingest_snapshot_upload({'order_data': path}, 'second')['snapshot_id']
+    main.get_snapshot_orders(second)
+    assert is_cached(second)
+
+    # 첫 스냅샷을 다른 파일로 바꾸면 공유 행이 두 번째 스냅샷 자리로 옮겨짐
+    with open(order_csv(tmp_path / 'patched.csv', 단가=[710.0] * 10), 'rb') as fileobj:
+        main.update_snapshot_tables(first, {'order_data': fileobj})
+    with main.engine.connect() as conn:
+        assert main.resolve_snapshot_table('order_data', second, conn) == (second, None)
+    assert not is_cached(second)
+
+
+def test_compaction_invalidates_every_reader(tmp_path, order_csv):
+    main.ingest_snapshot_upload({'order_data': order_csv(tmp_path / 'base.csv', 단가=[720.0] * 10)}, 'base')
+    quantities = [f"{1000 * (i + 1):,}" for i in range(10)]
+    quantities[2] = '3'
+    path = order_csv(tmp_path / 'delta.csv', 단가=[720.0] * 10, 미납잔량=quantities)
+    delta = main.ingest_snapshot_upload({'order_data': path}, 'delta')['snapshot_id']
+    sharer = main.ingest_snapshot_upload({'order_data': path}, 'same as delta')['snapshot_id']
+    for snapshot_id in (delta, sharer):
+        main.get_snapshot_orders(snapshot_id)
+
+    assert main.compact_snapshot(sharer)['compacted']
+    assert not is_cached(delta) and not is_cached(sharer)
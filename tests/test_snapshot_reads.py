@@ -0,0 +1,63 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def upload_delta_snapshot(tmp_path, order_csv, price):
+    """기준 스냅샷과 한 라인이 바뀐 델타 스냅샷을 올리고 (기준 id, 델타 id) 반환"""
+    base = main.ingest_snapshot_upload(
+        {'order_data': order_csv(tmp_path / 'base.csv', 단가=[price] * 10)}, 'base'
+    )
+    quantities = [f"{1000 * (i + 1):,}" for i in range(10)]
+    quantities[5] = '9'
+    delta = main.ingest_snapshot_upload(
+        {'order_data': order_csv(tmp_path / 'delta.csv', 단가=[price] * 10, 미납잔량=quantities)}, 'delta'
+    )
+    assert delta['tables']['order_data']['base_snapshot_id'] == base['snapshot_id']
+    return base['snapshot_id'], delta['snapshot_id']
+
+
+def read_ndjson(client, snapshot_id, **params):
+    query = "&".join(f"{name}={value}" for name, value in params.items())
+    response = client.get(f"/snapshots/{snapshot_id}/order_data?format=ndjson&{query}")
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_ndjson_cursor_walk_on_delta_snapshot(tmp_path, order_csv):
+    _, delta_id = upload_delta_snapshot(tmp_path, order_csv, 500.0)
+    client = TestClient(main.app)
+    expected = read_ndjson(client, delta_id)
+    assert len(expected) == 10
+
+    # 커서가 델타 쪽 행에도 걸리지 않으면 같은 행이 되풀이되므로 페이지 수를 제한
+    walked, cursor = [], 0
+    for _ in range(len(expected)):
+        rows = read_ndjson(client, delta_id, cursor=cursor, limit=3)
+        if not rows:
+            break
+        walked.extend(rows)
+        cursor = rows[-1]['id']
+    assert walked == expected
+    assert read_ndjson(client, delta_id, cursor=max(row['id'] for row in expected)) == []
+
+
+def test_stream_spans_compaction(tmp_path, order_csv):
+    _, delta_id = upload_delta_snapshot(tmp_path, order_csv, 600.0)
+    columns = ['id', 'customer_code', 'backlog_qty']
+    expected = list(main.iter_snapshot_table_rows('order_data', delta_id, columns))
+
+    # 위치 조회와 행 읽기가 한 문장이라, 읽는 도중 압축이 커밋돼도 읽기 시작 시점의 행만 나옴
+    rows = main.iter_snapshot_table_rows('order_data', delta_id, columns)
+    first = next(rows)
+    assert main.compact_snapshot(delta_id)['compacted']
+    assert [first, *rows] == expected
+
+    # 압축하면 기준 행이 새 id로 옮겨지므로 id를 빼고 비교
+    def values(records):
+        return sorted(tuple(value for key, value in record.items() if key != 'id') for record in records)
+
+    compacted = list(main.iter_snapshot_table_rows('order_data', delta_id, columns))
+    assert values(compacted) == values(expected)
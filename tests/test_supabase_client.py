@@ -0,0 +1,61 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from _lib import supabase as supabase_client
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def stats_delta(before):
+    after = supabase_client.get_client_stats()
+    return {name: after[name] - before[name] for name in before if name != "client_age_seconds"}
+
+
+def test_pooled_requests_count_as_reused():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    before = supabase_client.get_client_stats()
+    try:
+        with supabase_client._create_http_client() as client:
+            for _ in range(3):
+                client.get(f"http://127.0.0.1:{server.server_port}/")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    delta = stats_delta(before)
+    assert delta["requests"] == 3
+    assert delta["new_connections"] == 1
+    assert delta["reused_connections"] == 2
+    assert delta["failed_connections"] == 0
+
+
+def test_failed_connect_is_not_counted_as_reused():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    before = supabase_client.get_client_stats()
+
+    with supabase_client._create_http_client() as client:
+        with pytest.raises(httpx.ConnectError):
+            client.get(f"http://127.0.0.1:{port}/")
+
+    delta = stats_delta(before)
+    assert delta["requests"] == 1
+    assert delta["failed_connections"] == 1
+    assert delta["reused_connections"] == 0